@@ -8,13 +8,25 @@ echo "Waiting for database..."
 if [ "$1" = "celery" ]; then
     echo "Starting celery worker..."
     exec celery -A imdb_clone worker --loglevel=info
+elif [ "$1" = "celery-beat" ]; then
+    echo "Starting celery beat..."
+    exec celery -A imdb_clone beat --loglevel=info
 else
-    echo "Creating migrations..."
-    python manage.py makemigrations movies
+    # Migrations ship with the code; only apply them when some are missing.
+    echo "Checking migrations..."
+    if ! python manage.py migrate --check > /dev/null; then
+        echo "Running migrations..."
+        python manage.py migrate
+    fi
 
-    echo "Running migrations..."
-    python manage.py migrate
+    if [ "$1" = "runserver" ]; then
+        echo "Starting development server..."
+        exec python manage.py runserver 0.0.0.0:8000
+    fi
+
+    echo "Collecting static files..."
+    python manage.py collectstatic --noinput
 
     echo "Starting web server..."
-    exec python manage.py runserver 0.0.0.0:8000
+    exec gunicorn imdb_clone.asgi:application --config gunicorn.conf.py
 fi
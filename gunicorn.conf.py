@@ -0,0 +1,27 @@
+import multiprocessing
+import os
+
+# Production web server: gunicorn managing uvicorn workers that serve
+# imdb_clone.asgi. Every worker runs one event loop, so a few per CPU handle
+# many concurrent slow clients.
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+worker_class = "uvicorn_worker.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+
+# Import Django once in the master and fork the workers from it.
+preload_app = True
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then so slow leaks cannot build up.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = max_requests // 10
+
+# Under ASGI every request runs its ORM calls in its own thread, so persistent
+# connections pile up per thread. When PgBouncer fronts the database
+# (DB_POOLER), let it hold the connections instead; otherwise keep the
+# CONN_MAX_AGE from settings.
+if os.getenv("DB_POOLER", "False") == "True":
+    os.environ.setdefault("DB_CONN_MAX_AGE", "0")
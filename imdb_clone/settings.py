@@ -14,9 +14,6 @@ import os
 from datetime import timedelta
 from pathlib import Path
 
-import cloudinary
-import cloudinary.api
-import cloudinary.uploader
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -48,25 +45,26 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework_simplejwt",
     "corsheaders",
-    "cloudinary",
 ]
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "movies.authentication.CachedJWTAuthentication",
     ),
-    "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.UserRateThrottle",
-        "rest_framework.throttling.AnonRateThrottle",
-        "movies.throttles.CustomMovieThrottle",
+    "DEFAULT_RENDERER_CLASSES": [
+        "movies.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
     ],
+    "DEFAULT_THROTTLE_CLASSES": ["movies.throttles.TokenBucketThrottle"],
     "DEFAULT_THROTTLE_RATES": {
         "user": "10/minute",
         "anon": "5/minute",
         "movie": "5/minute",
+        "autocomplete": "120/minute",
     },
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
@@ -82,6 +80,25 @@ CACHES = {
     }
 }
 
+# Seconds a cached movie_list page lives; writes retire pages sooner by
+# bumping the catalog version.
+MOVIE_LIST_CACHE_TIMEOUT = int(os.getenv("MOVIE_LIST_CACHE_TIMEOUT", 300))
+
+# Seconds a user's movie_id -> score hash stays in Redis after it is loaded.
+USER_RATINGS_CACHE_TIMEOUT = int(os.getenv("USER_RATINGS_CACHE_TIMEOUT", 86400))
+
+# Seconds a movie_histogram/ response stays cached; votes drop it sooner.
+SCORE_HISTOGRAM_CACHE_TIMEOUT = int(os.getenv("SCORE_HISTOGRAM_CACHE_TIMEOUT", 3600))
+
+# Seconds an authenticated user stays cached for JWT authentication; saving
+# the user drops it sooner.
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv("AUTH_USER_CACHE_TIMEOUT", 300))
+
+# Unfiltered movie_list/ pages up to LEADERBOARD_PAGES are served from the Redis
+# popularity leaderboard; hydrated payloads are dropped after the timeout.
+LEADERBOARD_PAGES = int(os.getenv("LEADERBOARD_PAGES", 5))
+LEADERBOARD_PAYLOAD_TIMEOUT = int(os.getenv("LEADERBOARD_PAYLOAD_TIMEOUT", 3600))
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=1),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
@@ -93,6 +110,7 @@ SIMPLE_JWT = {
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -134,13 +152,110 @@ DATABASES = {
         "PASSWORD": os.getenv("DB_PASSWORD", "postgres"),
         "HOST": os.getenv("DB_HOST", "localhost"),
         "PORT": os.getenv("DB_PORT", 5432),
+        # Seconds a connection is reused across requests and tasks (0 opens one
+        # per request); a reused connection is health-checked before use.
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": True,
+        # Server-side cursors do not survive a transaction-mode pooler such as
+        # PgBouncer handing the next statement to another server connection.
+        "DISABLE_SERVER_SIDE_CURSORS": os.getenv("DB_POOLER", "False") == "True",
     }
 }
 
+# Read replicas of "default", as comma-separated hosts. The read-only list
+# views read from a random one that lags by at most REPLICA_MAX_LAG seconds;
+# each replica's lag is re-checked every REPLICA_LAG_CHECK_INTERVAL seconds.
+# Reads that fill a cache always go to the primary.
+DATABASE_REPLICAS = []
+for number, host in enumerate(os.getenv("DB_REPLICA_HOSTS", "").split(","), 1):
+    if host.strip():
+        DATABASES[f"replica_{number}"] = {**DATABASES["default"], "HOST": host.strip()}
+        DATABASE_REPLICAS.append(f"replica_{number}")
+
+DATABASE_ROUTERS = ["movies.routers.ReplicaRouter"]
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", 2))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL", 5))
+
 AUTH_USER_MODEL = "movies.CustomUser"
 
+# Text search configuration used for Movie.search_vector and search queries.
+SEARCH_CONFIG = os.getenv("SEARCH_CONFIG", "english")
+
+# Hard cap on suggestions returned by movie_autocomplete/.
+AUTOCOMPLETE_MAX_RESULTS = 10
+
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://redis:6379/0")
 
+# Worker processes per Celery worker. Django keeps at most one connection per
+# thread and database alias, so this also caps a worker's Postgres connections.
+CELERY_WORKER_CONCURRENCY = int(os.getenv("CELERY_WORKER_CONCURRENCY", 4))
+
+# Buffer rating deltas in Redis and apply them to movies in periodic batches.
+# Vote counts and averages may then lag by up to the flush interval (seconds).
+RATING_WRITE_BEHIND = os.getenv("RATING_WRITE_BEHIND", "False") == "True"
+RATING_BUFFER_FLUSH_INTERVAL = float(os.getenv("RATING_BUFFER_FLUSH_INTERVAL", 5))
+
+# Movies are ranked by an IMDb-style weighted rating stored in popularity:
+# (v / (v + m)) * R + (m / (v + m)) * C with C the mean of all votes and m the
+# minimum votes below. It is recomputed for the whole catalog every interval.
+WEIGHTED_RATING_MIN_VOTES = int(os.getenv("WEIGHTED_RATING_MIN_VOTES", 10))
+WEIGHTED_RATING_INTERVAL = float(os.getenv("WEIGHTED_RATING_INTERVAL", 300))
+
+# trending/ ranks movies by votes counted in hourly Redis buckets over the last
+# TRENDING_WINDOW_HOURS, each vote's weight halving every half-life. The
+# ranking is recomputed every TRENDING_INTERVAL seconds.
+TRENDING_WINDOW_HOURS = int(os.getenv("TRENDING_WINDOW_HOURS", 168))
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", 24))
+TRENDING_SIZE = int(os.getenv("TRENDING_SIZE", 1000))
+TRENDING_INTERVAL = float(os.getenv("TRENDING_INTERVAL", 600))
+
+# similar/ serves the SIMILAR_MOVIES_TOP_K nearest movies by rating cosine
+# similarity. The nightly job compares movies in blocks of about
+# SIMILAR_MOVIES_BLOCK_MEMORY bytes.
+SIMILAR_MOVIES_TOP_K = int(os.getenv("SIMILAR_MOVIES_TOP_K", 20))
+SIMILAR_MOVIES_BLOCK_MEMORY = int(
+    os.getenv("SIMILAR_MOVIES_BLOCK_MEMORY", 256 * 1024 * 1024)
+)
+
+# recommendations/ ranks movies by user x item factors from a nightly ALS job.
+# The factors are float32 .npy files the web workers memory-map, so web and
+# worker containers must share RECOMMENDER_DIR. Users who rate after training
+# get folded-in factors kept in Redis for RECOMMENDER_FOLD_IN_TIMEOUT seconds.
+RECOMMENDER_DIR = os.getenv("RECOMMENDER_DIR", str(BASE_DIR / "recommender"))
+RECOMMENDER_FACTORS = int(os.getenv("RECOMMENDER_FACTORS", 32))
+RECOMMENDER_ITERATIONS = int(os.getenv("RECOMMENDER_ITERATIONS", 10))
+RECOMMENDER_REGULARIZATION = float(os.getenv("RECOMMENDER_REGULARIZATION", 0.1))
+RECOMMENDER_BLOCK_MEMORY = int(os.getenv("RECOMMENDER_BLOCK_MEMORY", 128 * 1024 * 1024))
+RECOMMENDER_FOLD_IN_TIMEOUT = int(os.getenv("RECOMMENDER_FOLD_IN_TIMEOUT", 172800))
+RECOMMENDATIONS_TOP_K = 20
+
+CELERY_BEAT_SCHEDULE = {
+    "flush-rating-buffer": {
+        "task": "movies.tasks.flush_rating_buffer",
+        "schedule": RATING_BUFFER_FLUSH_INTERVAL,
+    },
+    "update-weighted-ratings": {
+        "task": "movies.tasks.update_weighted_ratings",
+        "schedule": WEIGHTED_RATING_INTERVAL,
+    },
+    "update-trending": {
+        "task": "movies.tasks.update_trending",
+        "schedule": TRENDING_INTERVAL,
+    },
+    "rebuild-autocomplete-index": {
+        "task": "movies.tasks.rebuild_autocomplete_index",
+        "schedule": timedelta(hours=24),
+    },
+    "compute-similar-movies": {
+        "task": "movies.tasks.compute_similar_movies",
+        "schedule": timedelta(hours=24),
+    },
+    "train-recommender": {
+        "task": "movies.tasks.train_recommender",
+        "schedule": timedelta(hours=24),
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -174,20 +289,28 @@ USE_I18N = True
 
 USE_TZ = True
 
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET"),
-    secure=True,
-)
+# The Cloudinary SDK configures itself from the CLOUDINARY_* environment
+# variables when first imported, so settings do not import it.
+os.environ.setdefault("CLOUDINARY_SECURE", "true")
+
+# Called as uploader(path, folder_name, file_name) -> secure URL.
+IMAGE_UPLOADER = "movies.utils.upload_image_to_cloudinary"
+
+# Incoming images are spooled to disk here and picked up by the Celery
+# upload tasks, so web and worker containers must share this directory.
+IMAGE_UPLOAD_DIR = os.getenv("IMAGE_UPLOAD_DIR", str(BASE_DIR / "uploads"))
+FILE_UPLOAD_HANDLERS = ["django.core.files.uploadhandler.TemporaryFileUploadHandler"]
 
 DEFAULT_FILE_STORAGE = "cloudinary_storage.storage.MediaCloudinaryStorage"
-MEDIA_URL = cloudinary.utils.cloudinary_url("")[0]
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
 STATIC_URL = "static/"
+STATIC_ROOT = os.getenv("STATIC_ROOT", str(BASE_DIR / "staticfiles"))
+# gunicorn serves the ASGI app without Django's static view, so WhiteNoise
+# serves the collected files with far-future cache headers.
+STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
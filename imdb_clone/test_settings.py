@@ -1,4 +1,7 @@
 import os
+import tempfile
+
+from fakeredis import FakeConnection
 
 from .settings import *  # noqa: F403, F401
 
@@ -15,8 +18,21 @@ DATABASES = {
         "TEST": {
             "NAME": "test_db",
         },
-    }
+    },
+    # A separate database standing in for a replica in the routing tests.
+    "replica": {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": "test_replica",
+        "USER": "postgres",
+        "PASSWORD": "postgres",
+        "HOST": "localhost",
+        "PORT": "5432",
+        "TEST": {
+            "NAME": "test_replica",
+        },
+    },
 }
+DATABASE_REPLICAS = []
 
 PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
 
@@ -24,12 +40,24 @@ EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
 
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "unique-snowflake",
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": "redis://localhost:6379/1",
+        "OPTIONS": {
+            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            "CONNECTION_POOL_KWARGS": {"connection_class": FakeConnection},
+        },
     }
 }
 
+# Tests do not run collectstatic; serve static files from the app directories.
+STATICFILES_STORAGE = "django.contrib.staticfiles.storage.StaticFilesStorage"
+WHITENOISE_USE_FINDERS = True
+WHITENOISE_AUTOREFRESH = True
+
 CELERY_TASK_ALWAYS_EAGER = True
+IMAGE_UPLOADER = "movies.tests.fakes.fake_upload"
+IMAGE_UPLOAD_DIR = os.path.join(tempfile.gettempdir(), "imdb_clone_uploads")
+RECOMMENDER_DIR = os.path.join(tempfile.gettempdir(), "imdb_clone_recommender")
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "memory://")
 
 DEBUG = os.getenv("DEBUG", "True") == "True"
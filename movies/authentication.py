@@ -0,0 +1,48 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .caching import get_cached_user, set_cached_user
+
+TOKEN_VERSION_CLAIM = "ver"
+
+
+class UserRefreshToken(RefreshToken):
+    """Refresh token carrying the user's token version into its access tokens."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[TOKEN_VERSION_CLAIM] = user.token_version
+        return token
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that resolves the user from the cache, keyed by user id
+    and the token's version, and only queries the database on a miss.
+
+    Tokens issued before the user's token version was bumped are rejected;
+    tokens without a version claim count as version 0.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        version = validated_token.get(TOKEN_VERSION_CLAIM, 0)
+
+        user = get_cached_user(user_id, version)
+        if user is not None:
+            return user
+
+        user = super().get_user(validated_token)
+        if user.token_version != version:
+            raise AuthenticationFailed(
+                _("Token has been revoked"), code="token_revoked"
+            )
+        set_cached_user(user)
+        return user
@@ -0,0 +1,161 @@
+import json
+import logging
+import re
+import unicodedata
+
+from django.conf import settings
+from django_redis import get_redis_connection
+
+from .models import Movie
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = "autocomplete:generation"
+PREFIX_KEY = "autocomplete:{generation}:prefix:{prefix}"
+TITLES_KEY = "autocomplete:{generation}:titles"
+KEYS_KEY = "autocomplete:{generation}:keys"
+REBUILD_KEY = "autocomplete:rebuild_queued"
+# A queued rebuild that has not finished by then may be queued again.
+REBUILD_TIMEOUT = 15 * 60
+
+MAX_PREFIX_LENGTH = 20
+# Movies kept per prefix; queries never return more than this.
+PREFIX_SIZE = 50
+BATCH_SIZE = 2000
+
+
+def normalize(text):
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(re.sub(r"[^\w]+", " ", text.lower()).split())
+
+
+def title_prefixes(*titles):
+    """Prefixes of every word-start suffix of the titles, e.g. "the m", "mat"."""
+    prefixes = set()
+    for title in titles:
+        words = normalize(title).split()
+        for start in range(len(words)):
+            tail = " ".join(words[start:])[:MAX_PREFIX_LENGTH]
+            prefixes.update(tail[:end] for end in range(1, len(tail) + 1))
+    return prefixes
+
+
+def index_movies(movies, generation=None, conn=None):
+    """
+    Add ``(id, title, original_title, popularity)`` rows to the prefix index.
+
+    Each prefix is a sorted set scored by popularity and trimmed to the
+    ``PREFIX_SIZE`` most popular movies, so lookups stay O(log n).
+    """
+    conn = conn or get_redis_connection("default")
+    generation = generation or conn.get(GENERATION_KEY)
+    if generation is None:
+        return
+    if isinstance(generation, bytes):
+        generation = generation.decode()
+
+    titles_key = TITLES_KEY.format(generation=generation)
+    keys_key = KEYS_KEY.format(generation=generation)
+
+    pipe = conn.pipeline(transaction=False)
+    for movie_id, title, original_title, popularity in movies:
+        pipe.hset(titles_key, movie_id, json.dumps({"id": movie_id, "title": title}))
+        for prefix in title_prefixes(title, original_title):
+            key = PREFIX_KEY.format(generation=generation, prefix=prefix)
+            pipe.zadd(key, {movie_id: popularity})
+            pipe.zremrangebyrank(key, 0, -PREFIX_SIZE - 1)
+            pipe.sadd(keys_key, key)
+    pipe.execute()
+
+
+def rebuild_index():
+    """Build a fresh index generation from the catalog, then switch to it."""
+    conn = get_redis_connection("default")
+    generation = str(conn.incr(f"{GENERATION_KEY}:counter"))
+
+    rows = Movie.objects.values_list(
+        "id", "title", "original_title", "popularity"
+    ).iterator(chunk_size=BATCH_SIZE)
+    batch = []
+    indexed = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            index_movies(batch, generation, conn)
+            indexed += len(batch)
+            batch = []
+    index_movies(batch, generation, conn)
+    indexed += len(batch)
+
+    previous = conn.getset(GENERATION_KEY, generation)
+    conn.delete(REBUILD_KEY)
+    if previous is not None:
+        drop_generation(previous.decode(), conn)
+    logger.info(f"Autocomplete index generation {generation}: {indexed} movies")
+    return indexed
+
+
+def drop_generation(generation, conn):
+    keys_key = KEYS_KEY.format(generation=generation)
+    for keys in _batched(conn.sscan_iter(keys_key, count=BATCH_SIZE)):
+        conn.unlink(*keys)
+    conn.unlink(keys_key, TITLES_KEY.format(generation=generation))
+
+
+def suggest(query, limit):
+    """Return up to ``limit`` movies whose title has a word starting with query."""
+    normalized = normalize(query)
+    if not normalized:
+        return []
+    limit = min(limit, settings.AUTOCOMPLETE_MAX_RESULTS)
+
+    conn = get_redis_connection("default")
+    generation = conn.get(GENERATION_KEY)
+    if generation is None:
+        queue_rebuild(conn)
+        return _suggest_from_database(query, limit)
+    generation = generation.decode()
+
+    key = PREFIX_KEY.format(
+        generation=generation, prefix=normalized[:MAX_PREFIX_LENGTH]
+    )
+    overflow = len(normalized) > MAX_PREFIX_LENGTH
+    movie_ids = conn.zrevrange(key, 0, (PREFIX_SIZE if overflow else limit) - 1)
+    if not movie_ids:
+        return []
+
+    titles_key = TITLES_KEY.format(generation=generation)
+    results = [json.loads(item) for item in conn.hmget(titles_key, movie_ids) if item]
+    if overflow:
+        results = [item for item in results if normalized in normalize(item["title"])]
+    return results[:limit]
+
+
+def queue_rebuild(conn):
+    """Queue one index rebuild, however many requests find the index missing."""
+    if conn.set(REBUILD_KEY, 1, nx=True, ex=REBUILD_TIMEOUT):
+        # Imported here because the tasks module imports this one.
+        from .tasks import rebuild_autocomplete_index
+
+        rebuild_autocomplete_index.delay()
+
+
+def _suggest_from_database(query, limit):
+    # Uses movie_title_upper_prefix_idx until the Redis index is built.
+    return list(
+        Movie.objects.filter(title__istartswith=query.strip())
+        .order_by("-popularity", "-id")
+        .values("id", "title")[:limit]
+    )
+
+
+def _batched(iterable, size=500):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
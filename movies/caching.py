@@ -0,0 +1,135 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+CATALOG_VERSION_KEY = "catalog:version"
+MOVIE_LIST_KEY = "movie_list:v{version}:{kind}:{value}"
+HITS_KEY = "movie_list:cache_hits"
+MISSES_KEY = "movie_list:cache_misses"
+HISTOGRAM_KEY = "score_histogram:{movie_id}"
+AUTH_USER_KEY = "auth_user:{user_id}:v{version}"
+
+
+def get_catalog_version():
+    # Seeding from the clock keeps a lost version key from reusing the
+    # version of pages that are still cached.
+    return cache.get_or_set(
+        CATALOG_VERSION_KEY, lambda: int(time.time() * 1000), timeout=None
+    )
+
+
+def bump_catalog_version():
+    """Retire every cached movie page once the current transaction commits."""
+    transaction.on_commit(_bump_catalog_version)
+
+
+def _bump_catalog_version():
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        get_catalog_version()
+
+
+async def aget_catalog_version():
+    return await cache.aget_or_set(
+        CATALOG_VERSION_KEY, lambda: int(time.time() * 1000), timeout=None
+    )
+
+
+async def amovie_page_cache_key(page=None, cursor=None, filters=None):
+    if cursor is not None:
+        kind, value = "cursor", hashlib.md5(cursor.encode()).hexdigest()
+    else:
+        kind, value = "page", page
+    if filters:
+        encoded = json.dumps(filters, sort_keys=True, default=str)
+        value = f"{value}:{hashlib.md5(encoded.encode()).hexdigest()}"
+    version = await aget_catalog_version()
+    return MOVIE_LIST_KEY.format(version=version, kind=kind, value=value)
+
+
+async def aget_cached_movie_page(key):
+    data = await cache.aget(key)
+    await _aincr(MISSES_KEY if data is None else HITS_KEY)
+    return data
+
+
+async def aset_cached_movie_page(key, data):
+    await cache.aset(key, data, timeout=settings.MOVIE_LIST_CACHE_TIMEOUT)
+
+
+async def aget_cached_histogram(movie_id):
+    return await cache.aget(HISTOGRAM_KEY.format(movie_id=movie_id))
+
+
+async def aset_cached_histogram(movie_id, data):
+    await cache.aset(
+        HISTOGRAM_KEY.format(movie_id=movie_id),
+        data,
+        timeout=settings.SCORE_HISTOGRAM_CACHE_TIMEOUT,
+    )
+
+
+def drop_cached_histograms(movie_ids=None):
+    """
+    Forget the cached histograms of ``movie_ids`` (or all of them) once the
+    current transaction commits.
+    """
+    if movie_ids is None:
+        pattern = HISTOGRAM_KEY.format(movie_id="*")
+        transaction.on_commit(lambda: cache.delete_pattern(pattern))
+    elif movie_ids:
+        keys = [HISTOGRAM_KEY.format(movie_id=pk) for pk in movie_ids]
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def get_cached_user(user_id, version):
+    return cache.get(AUTH_USER_KEY.format(user_id=user_id, version=version))
+
+
+def set_cached_user(user):
+    cache.set(
+        AUTH_USER_KEY.format(user_id=user.pk, version=user.token_version),
+        user,
+        timeout=settings.AUTH_USER_CACHE_TIMEOUT,
+    )
+
+
+def drop_cached_user(user_id, versions):
+    """
+    Forget the cached user under each token version in ``versions`` once the
+    current transaction commits.
+    """
+    keys = [AUTH_USER_KEY.format(user_id=user_id, version=v) for v in versions]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def get_cache_stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total, 4) if total else 0,
+    }
+
+
+def _incr(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+async def _aincr(key):
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, 1, timeout=None):
+            await cache.aincr(key)
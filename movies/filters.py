@@ -0,0 +1,71 @@
+from django.db.models import CharField, Count, Exists, OuterRef, Value
+from django.db.models.functions import Cast, ExtractYear
+
+from .models import Movie
+
+MovieCategory = Movie.categories.through
+
+
+def filter_movies(queryset, filters):
+    """Apply validated ``MovieFilterSerializer`` data to a Movie queryset."""
+    if filters.get("categories"):
+        queryset = queryset.filter(
+            Exists(
+                MovieCategory.objects.filter(
+                    movie_id=OuterRef("pk"), category_id__in=filters["categories"]
+                )
+            )
+        )
+    if filters.get("language"):
+        queryset = queryset.filter(original_language=filters["language"])
+    if filters.get("release_from"):
+        queryset = queryset.filter(release_date__gte=filters["release_from"])
+    if filters.get("release_to"):
+        queryset = queryset.filter(release_date__lte=filters["release_to"])
+    if filters.get("adult") is not None:
+        queryset = queryset.filter(adult=filters["adult"])
+    return queryset
+
+
+def has_filters(filters):
+    """Whether ``filter_movies`` would narrow the queryset with these filters."""
+    fields = ("categories", "language", "release_from", "release_to")
+    return any(filters.get(name) for name in fields) or filters.get("adult") is not None
+
+
+def facet_counts(queryset):
+    """
+    Count the movies of ``queryset`` per category, language, year and adult
+    flag with a single UNION ALL aggregate query.
+    """
+    movie_ids = queryset.order_by().values("pk")
+
+    def facet(source, name, expression):
+        return (
+            source.order_by()
+            .annotate(facet=Value(name), value=Cast(expression, CharField()))
+            .values("facet", "value")
+            .annotate(count=Count("*"))
+            .values_list("facet", "value", "count")
+        )
+
+    movies = Movie.objects.filter(pk__in=movie_ids)
+    query = facet(
+        MovieCategory.objects.filter(movie_id__in=movie_ids),
+        "categories",
+        "category_id",
+    ).union(
+        facet(movies, "language", "original_language"),
+        facet(movies, "year", ExtractYear("release_date")),
+        facet(movies, "adult", "adult"),
+        all=True,
+    )
+
+    facets = {"categories": {}, "language": {}, "year": {}, "adult": {}}
+    for name, value, count in query:
+        if name in ("categories", "year"):
+            value = int(value)
+        elif name == "adult":
+            value = value == "true"
+        facets[name][value] = count
+    return facets
@@ -0,0 +1,218 @@
+import csv
+import itertools
+import json
+import logging
+import os
+import time
+from datetime import date
+
+from django.db import transaction
+
+from .autocomplete import index_movies
+from .caching import bump_catalog_version
+from .leaderboard import record_popularity
+from .models import Category, Movie
+
+logger = logging.getLogger(__name__)
+
+MovieCategory = Movie.categories.through
+
+FLOAT_FIELDS = ("popularity", "vote_average")
+BOOLEAN_FIELDS = ("video", "adult")
+TEXT_FIELDS = ("original_language", "poster_path", "backdrop_path")
+
+
+def detect_format(path):
+    return "csv" if str(path).lower().endswith(".csv") else "jsonl"
+
+
+def iter_records(path, fmt):
+    """Yield one dict per JSONL line or CSV row without reading the whole file."""
+    if fmt == "csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+        return
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # Still yield, so checkpoints keep counting input records.
+                yield {}
+
+
+def parse_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes")
+    return bool(value)
+
+
+def parse_categories(value):
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split("|")
+    return [name.strip() for name in value if name and name.strip()]
+
+
+def build_movie(record):
+    """Turn an input record into an unsaved Movie and its category names."""
+    title = (record.get("title") or "").strip()
+    if not title or not record.get("release_date"):
+        raise ValueError("title and release_date are required")
+
+    movie = Movie(
+        title=title,
+        original_title=record.get("original_title") or title,
+        overview=record.get("overview") or "",
+        release_date=date.fromisoformat(str(record["release_date"])[:10]),
+        vote_count=int(record.get("vote_count") or 0),
+    )
+    for field in FLOAT_FIELDS:
+        setattr(movie, field, float(record.get(field) or 0))
+    for field in BOOLEAN_FIELDS:
+        setattr(movie, field, parse_bool(record.get(field)))
+    for field in TEXT_FIELDS:
+        if record.get(field):
+            setattr(movie, field, record[field])
+
+    for field in ("title", "original_title", "original_language"):
+        max_length = Movie._meta.get_field(field).max_length
+        if len(getattr(movie, field)) > max_length:
+            raise ValueError(f"{field} is longer than {max_length} characters")
+    # Keep the running vote sum consistent with the imported average so
+    # later ratings shift it like any other vote.
+    movie.vote_sum = round(movie.vote_average * movie.vote_count)
+
+    return movie, parse_categories(record.get("categories") or record.get("genres"))
+
+
+class CatalogImporter:
+    """
+    Bulk-load movies from a JSONL or CSV file in fixed-size batches.
+
+    Each batch costs one duplicate lookup, one ``bulk_create`` into ``Movie``
+    and one into the ``Movie.categories`` through table. Movies that already
+    exist with the same title and release date are skipped. With a
+    ``checkpoint_path`` the number of consumed records is saved after every
+    committed batch, so an interrupted import resumes where it stopped.
+    """
+
+    def __init__(self, batch_size=1000, checkpoint_path=None):
+        self.batch_size = batch_size
+        self.checkpoint_path = checkpoint_path
+        self.category_ids = dict(Category.objects.values_list("category_name", "id"))
+        self.stats = {"read": 0, "inserted": 0, "skipped": 0, "invalid": 0}
+
+    def run(self, path, fmt=None):
+        fmt = fmt or detect_format(path)
+        resume_from = self.load_checkpoint()
+        records = itertools.islice(iter_records(path, fmt), resume_from, None)
+        consumed = resume_from
+
+        started = time.monotonic()
+        while True:
+            batch = list(itertools.islice(records, self.batch_size))
+            if not batch:
+                break
+            self.import_batch(batch)
+            consumed += len(batch)
+            self.save_checkpoint(consumed)
+
+        elapsed = time.monotonic() - started
+        self.stats["seconds"] = round(elapsed, 3)
+        self.stats["rows_per_second"] = (
+            round(self.stats["inserted"] / elapsed, 1) if elapsed else 0
+        )
+        if self.stats["inserted"]:
+            bump_catalog_version()
+        logger.info(f"Catalog import finished: {self.stats}")
+        return self.stats
+
+    def import_batch(self, records):
+        self.stats["read"] += len(records)
+
+        rows = {}
+        for record in records:
+            try:
+                movie, category_names = build_movie(record)
+            except (ValueError, TypeError, AttributeError) as e:
+                logger.warning(f"Skipping invalid catalog record: {e}")
+                self.stats["invalid"] += 1
+                continue
+            key = (movie.title, movie.release_date)
+            if key in rows:
+                self.stats["skipped"] += 1
+                continue
+            rows[key] = (movie, category_names)
+
+        if rows:
+            existing = set(
+                Movie.objects.filter(
+                    title__in={title for title, _ in rows},
+                    release_date__in={release_date for _, release_date in rows},
+                ).values_list("title", "release_date")
+            )
+            duplicates = existing & rows.keys()
+            for key in duplicates:
+                del rows[key]
+            self.stats["skipped"] += len(duplicates)
+
+        if not rows:
+            return
+
+        with transaction.atomic():
+            self.ensure_categories(
+                {name for _, names in rows.values() for name in names}
+            )
+            movies = Movie.objects.bulk_create([movie for movie, _ in rows.values()])
+            Movie.objects.filter(
+                pk__in=[movie.id for movie in movies]
+            ).update_search_vectors()
+            MovieCategory.objects.bulk_create(
+                [
+                    MovieCategory(
+                        movie_id=movie.id, category_id=self.category_ids[name]
+                    )
+                    for movie, names in rows.values()
+                    for name in set(names)
+                ],
+                ignore_conflicts=True,
+            )
+        self.stats["inserted"] += len(movies)
+        record_popularity({movie.id: movie.popularity for movie in movies})
+        index_movies(
+            (movie.id, movie.title, movie.original_title, movie.popularity)
+            for movie in movies
+        )
+
+    def ensure_categories(self, names):
+        missing = names - self.category_ids.keys()
+        if not missing:
+            return
+        Category.objects.bulk_create(
+            [Category(category_name=name) for name in missing],
+            ignore_conflicts=True,
+        )
+        self.category_ids.update(
+            Category.objects.filter(category_name__in=missing).values_list(
+                "category_name", "id"
+            )
+        )
+
+    def load_checkpoint(self):
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return 0
+        with open(self.checkpoint_path) as f:
+            return json.load(f)["records"]
+
+    def save_checkpoint(self, records):
+        if not self.checkpoint_path:
+            return
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"records": records}, f)
+        os.replace(tmp_path, self.checkpoint_path)
@@ -0,0 +1,141 @@
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django_redis import get_redis_connection
+
+from .models import Movie
+
+LEADERBOARD_KEY = "leaderboard:popularity"
+PAYLOADS_KEY = "leaderboard:movies"
+READY_KEY = "leaderboard:ready"
+BATCH_SIZE = 5000
+
+
+def member(movie_id):
+    # Zero-padded so ZREVRANGE breaks popularity ties by descending id, the
+    # same order as the "-popularity", "-id" queries.
+    return f"{movie_id:012d}"
+
+
+def record_popularity(scores):
+    """
+    Move ``{movie_id: popularity}`` in the leaderboard once the current
+    transaction commits, dropping their cached payloads.
+    """
+    if scores:
+        transaction.on_commit(lambda: _record_popularity(scores))
+
+
+def _record_popularity(scores):
+    conn = get_redis_connection("default")
+    movie_ids = list(scores)
+    pipe = conn.pipeline()
+    for start in range(0, len(movie_ids), BATCH_SIZE):
+        end = start + BATCH_SIZE
+        batch = movie_ids[start:end]
+        pipe.zadd(LEADERBOARD_KEY, {member(pk): scores[pk] for pk in batch})
+        pipe.hdel(PAYLOADS_KEY, *batch)
+    pipe.execute()
+
+
+def is_ready():
+    """Whether the leaderboard has been built since Redis last lost it."""
+    return bool(get_redis_connection("default").exists(READY_KEY))
+
+
+def drop_payloads(movie_ids=None):
+    """
+    Forget the cached payloads of ``movie_ids`` (or all of them) once the
+    current transaction commits.
+    """
+    conn = get_redis_connection("default")
+    if movie_ids is None:
+        transaction.on_commit(lambda: conn.delete(PAYLOADS_KEY))
+    elif movie_ids:
+        transaction.on_commit(lambda: conn.hdel(PAYLOADS_KEY, *movie_ids))
+
+
+def get_page(page_number, per_page, hydrate):
+    """
+    Return the payloads of a popularity page straight from Redis, or None when
+    the page is outside the leaderboard and must come from Postgres.
+
+    ``hydrate(movie_ids)`` builds ``{movie_id: payload}`` for movies whose
+    payload is not cached yet.
+    """
+    if not 1 <= page_number <= settings.LEADERBOARD_PAGES:
+        return None
+
+    conn = get_redis_connection("default")
+    start = (page_number - 1) * per_page
+    pipe = conn.pipeline(transaction=False)
+    pipe.exists(READY_KEY)
+    pipe.zrevrange(LEADERBOARD_KEY, start, start + per_page - 1)
+    ready, members = pipe.execute()
+    if not ready or not members:
+        return None
+
+    return get_payloads([int(value) for value in members], hydrate)
+
+
+def get_payloads(movie_ids, hydrate):
+    """
+    Return the list payloads of ``movie_ids`` in order, hydrating and caching
+    the ones missing from the payload hash.
+    """
+    if not movie_ids:
+        return []
+
+    conn = get_redis_connection("default")
+    cached = conn.hmget(PAYLOADS_KEY, movie_ids)
+    payloads = {
+        movie_id: json.loads(item)
+        for movie_id, item in zip(movie_ids, cached)
+        if item is not None
+    }
+
+    missing = [movie_id for movie_id in movie_ids if movie_id not in payloads]
+    if missing:
+        hydrated = hydrate(missing)
+        if hydrated:
+            pipe = conn.pipeline()
+            pipe.hset(
+                PAYLOADS_KEY,
+                mapping={pk: json.dumps(item) for pk, item in hydrated.items()},
+            )
+            pipe.expire(PAYLOADS_KEY, settings.LEADERBOARD_PAYLOAD_TIMEOUT, nx=True)
+            pipe.execute()
+        payloads.update(hydrated)
+
+    return [payloads[movie_id] for movie_id in movie_ids if movie_id in payloads]
+
+
+def rebuild():
+    """Replace the leaderboard with the popularity of every movie."""
+    rows = Movie.objects.values_list("id", "popularity").iterator(chunk_size=BATCH_SIZE)
+    conn = get_redis_connection("default")
+    building_key = f"{LEADERBOARD_KEY}:building"
+    conn.delete(building_key)
+
+    count = 0
+    batch = {}
+    for movie_id, popularity in rows:
+        batch[member(movie_id)] = popularity
+        if len(batch) == BATCH_SIZE:
+            conn.zadd(building_key, batch)
+            count += len(batch)
+            batch = {}
+    if batch:
+        conn.zadd(building_key, batch)
+        count += len(batch)
+
+    pipe = conn.pipeline()
+    if count:
+        pipe.rename(building_key, LEADERBOARD_KEY)
+    else:
+        pipe.delete(LEADERBOARD_KEY)
+    pipe.delete(PAYLOADS_KEY)
+    pipe.set(READY_KEY, 1)
+    pipe.execute()
+    return count
@@ -0,0 +1,61 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+
+
+class Command(BaseCommand):
+    help = (
+        "Time a one-query request cycle with a new database connection per "
+        "request and with a persistent, health-checked connection."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        original = {
+            key: connection.settings_dict[key]
+            for key in ("CONN_MAX_AGE", "CONN_HEALTH_CHECKS")
+        }
+        opened = []
+
+        def count(sender, connection, **kwargs):
+            opened.append(connection.alias)
+
+        connection_created.connect(count)
+        try:
+            for name, max_age in (("per_request", 0), ("persistent", 600)):
+                connection.close()
+                connection.settings_dict["CONN_MAX_AGE"] = max_age
+                connection.settings_dict["CONN_HEALTH_CHECKS"] = max_age > 0
+                opened.clear()
+
+                latencies = []
+                for _ in range(options["requests"]):
+                    started = time.perf_counter()
+                    # The same signals that open and close connections around
+                    # every Django request and Celery task.
+                    request_started.send(sender=self.__class__)
+                    with connection.cursor() as cursor:
+                        cursor.execute("SELECT 1")
+                        cursor.fetchone()
+                    request_finished.send(sender=self.__class__)
+                    latencies.append((time.perf_counter() - started) * 1e6)
+                latencies.sort()
+
+                self.stdout.write(
+                    f"{name}: mean_us={statistics.mean(latencies):.0f} "
+                    f"p50_us={latencies[len(latencies) // 2]:.0f} "
+                    f"p99_us={latencies[int(len(latencies) * 0.99)]:.0f} "
+                    f"connections_opened={len(opened)}"
+                )
+        finally:
+            connection_created.disconnect(count)
+            connection.close()
+            connection.settings_dict.update(original)
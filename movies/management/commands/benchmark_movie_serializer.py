@@ -0,0 +1,68 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from movies.models import Movie
+from movies.renderers import ORJSONRenderer
+from movies.serializers import MovieListSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare MovieListSerializer and JSONRenderer with the .values() fast "
+        "path and ORJSONRenderer on the top movies, and check the bytes match."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--movies", type=int, default=10_000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        queryset = Movie.objects.order_by("-popularity", "-id")[: options["movies"]]
+        paths = {"serializer": self.serializer_path, "fast_path": self.fast_path}
+
+        outputs = {}
+        for name, path in paths.items():
+            timings = [path(queryset) for _ in range(options["repeat"])]
+            outputs[name] = timings[-1].pop("output")
+            summary = " ".join(
+                f"{step}_ms={statistics.median(t[step] for t in timings):.1f}"
+                for step in ("fetch", "serialize", "render", "total")
+            )
+            self.stdout.write(f"{name}: {summary}")
+
+        if outputs["serializer"] != outputs["fast_path"]:
+            raise CommandError("Fast path output differs from the serializer.")
+        self.stdout.write(f"bytes={len(outputs['serializer'])} identical=True")
+
+    def serializer_path(self, queryset):
+        started = time.perf_counter()
+        movies = list(queryset.all())
+        context = MovieListSerializer.build_context(None, movies, with_ratings=False)
+        fetched = time.perf_counter()
+        data = MovieListSerializer(movies, many=True, context=context).data
+        serialized = time.perf_counter()
+        output = JSONRenderer().render({"page": 1, "results": data})
+        return self.timings(started, fetched, serialized, output)
+
+    def fast_path(self, queryset):
+        started = time.perf_counter()
+        rows = list(queryset.values(*MovieListSerializer.VALUE_FIELDS))
+        context = MovieListSerializer.build_context(None, rows, with_ratings=False)
+        fetched = time.perf_counter()
+        data = MovieListSerializer.from_values(rows, context)
+        serialized = time.perf_counter()
+        output = ORJSONRenderer().render({"page": 1, "results": data})
+        return self.timings(started, fetched, serialized, output)
+
+    def timings(self, started, fetched, serialized, output):
+        rendered = time.perf_counter()
+        return {
+            "fetch": (fetched - started) * 1000,
+            "serialize": (serialized - fetched) * 1000,
+            "render": (rendered - serialized) * 1000,
+            "total": (rendered - started) * 1000,
+            "output": output,
+        }
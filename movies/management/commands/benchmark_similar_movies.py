@@ -0,0 +1,55 @@
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from movies.similarity import block_rows, build_item_matrix, top_k_neighbors
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the similar-movies computation on a synthetic rating matrix "
+        "without touching the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ratings", type=int, default=10_000_000)
+        parser.add_argument("--users", type=int, default=500_000)
+        parser.add_argument("--movies", type=int, default=20_000)
+        parser.add_argument("--top-k", type=int, default=settings.SIMILAR_MOVIES_TOP_K)
+        parser.add_argument(
+            "--block-memory",
+            type=int,
+            default=settings.SIMILAR_MOVIES_BLOCK_MEMORY,
+            help="Bytes per similarity block.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        count = options["ratings"]
+
+        # Long-tailed popularity, like a real catalog: a few titles get most votes.
+        weights = 1 / np.arange(1, options["movies"] + 1) ** 0.8
+        movie_ids = rng.choice(options["movies"], size=count, p=weights / weights.sum())
+        user_ids = rng.integers(0, options["users"], size=count)
+        scores = rng.integers(1, 11, size=count).astype(np.float32)
+
+        started = time.monotonic()
+        matrix, _ = build_item_matrix(user_ids, movie_ids, scores)
+        built = time.monotonic()
+
+        block_size = block_rows(matrix.shape[0], options["block_memory"])
+        neighbors = 0
+        for _, found, _ in top_k_neighbors(matrix, options["top_k"], block_size):
+            neighbors += len(found)
+        finished = time.monotonic()
+
+        self.stdout.write(
+            f"ratings={matrix.nnz} movies={matrix.shape[0]} users={matrix.shape[1]} "
+            f"block_rows={block_size} neighbors={neighbors}\n"
+            f"matrix_seconds={built - started:.2f} "
+            f"neighbor_seconds={finished - built:.2f} "
+            f"total_seconds={finished - started:.2f}"
+        )
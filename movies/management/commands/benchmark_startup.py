@@ -0,0 +1,72 @@
+import json
+import statistics
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Run in a fresh interpreter so every run pays the full cold-start cost.
+STARTUP_SCRIPT = """
+import json
+import sys
+import time
+
+started = time.perf_counter()
+import django
+from django.conf import settings
+
+settings.INSTALLED_APPS
+configured = time.perf_counter()
+django.setup()
+ready = time.perf_counter()
+
+from django.test import Client
+
+response = Client(HTTP_HOST="localhost").get(sys.argv[1])
+served = time.perf_counter()
+print(json.dumps({
+    "status": response.status_code,
+    "settings_ms": (configured - started) * 1000,
+    "setup_ms": (ready - configured) * 1000,
+    "first_request_ms": (served - ready) * 1000,
+    "total_ms": (served - started) * 1000,
+    "modules": [
+        name
+        for name in ("cloudinary.api", "cloudinary.uploader", "scipy")
+        if name in sys.modules
+    ],
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Time a cold process from importing Django to serving its first "
+        "request, split into settings, app loading and the request itself."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--url", default="/category_list/")
+
+    def handle(self, *args, **options):
+        runs = []
+        for _ in range(options["runs"]):
+            result = subprocess.run(
+                [sys.executable, "-c", STARTUP_SCRIPT, options["url"]],
+                capture_output=True,
+                text=True,
+            )
+            if result.returncode:
+                raise CommandError(result.stderr)
+            runs.append(json.loads(result.stdout.splitlines()[-1]))
+
+        timings = " ".join(
+            f"{key}={statistics.median(run[key] for run in runs):.0f}"
+            for key in ("settings_ms", "setup_ms", "first_request_ms", "total_ms")
+        )
+        loaded = ",".join(runs[-1]["modules"]) or "-"
+        self.stdout.write(
+            f"runs={len(runs)} status={runs[-1]['status']} {timings} "
+            f"heavy_modules_loaded={loaded}"
+        )
@@ -0,0 +1,92 @@
+import statistics
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework.throttling import (
+    AnonRateThrottle,
+    ScopedRateThrottle,
+    UserRateThrottle,
+)
+
+from movies.throttles import TokenBucketThrottle, parse_rate
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare latency and accuracy under concurrency of the stacked DRF "
+        "throttles with the Redis token-bucket throttle."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument(
+            "--rate", default="100/minute", help="Rate of every throttled scope."
+        )
+
+    def handle(self, *args, **options):
+        rates = {scope: options["rate"] for scope in ("user", "anon", "movie")}
+        stacks = {
+            "drf": [
+                type(cls.__name__, (cls,), {"THROTTLE_RATES": rates})
+                for cls in (UserRateThrottle, AnonRateThrottle, ScopedRateThrottle)
+            ],
+            "token_bucket": [
+                type("TokenBucketThrottle", (TokenBucketThrottle,), {"rates": rates})
+            ],
+        }
+        # Both stacks see the same two scopes: the per-user rate and the view's.
+        view = SimpleNamespace(throttle_scope="movie")
+        capacity, _ = parse_rate(options["rate"])
+
+        for name, classes in stacks.items():
+            run = uuid.uuid4().hex[:8]
+            latencies = []
+            for i in range(options["requests"]):
+                request = self.build_request(f"{run}-{i % options['users']}")
+                started = time.perf_counter()
+                self.throttle(classes, request, view)
+                latencies.append((time.perf_counter() - started) * 1e6)
+            latencies.sort()
+
+            allowed = self.hammer(
+                classes, view, f"{run}-shared", options["requests"], options["threads"]
+            )
+            self.stdout.write(
+                f"{name}: mean_us={statistics.mean(latencies):.0f} "
+                f"p50_us={latencies[len(latencies) // 2]:.0f} "
+                f"p99_us={latencies[int(len(latencies) * 0.99)]:.0f} "
+                f"concurrent_allowed={allowed} expected={capacity}"
+            )
+
+    def build_request(self, user_id):
+        request = Request(APIRequestFactory().get("/movie_list/"))
+        request.user = SimpleNamespace(pk=user_id, is_authenticated=True)
+        return request
+
+    def throttle(self, classes, request, view):
+        return all(cls().allow_request(request, view) for cls in classes)
+
+    def hammer(self, classes, view, user_id, count, threads):
+        """Fire ``count`` requests of one user from ``threads`` threads at once."""
+        allowed = []
+        barrier = threading.Barrier(threads)
+
+        def worker():
+            request = self.build_request(user_id)
+            barrier.wait()
+            for _ in range(count // threads):
+                allowed.append(self.throttle(classes, request, view))
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return sum(allowed)
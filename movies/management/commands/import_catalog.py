@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from movies.importer import CatalogImporter
+
+
+class Command(BaseCommand):
+    help = "Bulk-import movies from a JSONL or CSV file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="JSONL or CSV file to import.")
+        parser.add_argument(
+            "--format",
+            choices=["jsonl", "csv"],
+            help="Input format (default: guessed from the file extension).",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--checkpoint",
+            help="File recording progress, used to resume an interrupted import.",
+        )
+
+    def handle(self, *args, **options):
+        importer = CatalogImporter(
+            batch_size=options["batch_size"], checkpoint_path=options["checkpoint"]
+        )
+        stats = importer.run(options["path"], options["format"])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {stats['inserted']} movies "
+                f"({stats['skipped']} duplicates, {stats['invalid']} invalid) "
+                f"in {stats['seconds']}s: {stats['rows_per_second']} rows/s."
+            )
+        )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from movies.caching import get_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counters of the movie_list response cache."
+
+    def handle(self, *args, **options):
+        stats = get_cache_stats()
+        self.stdout.write(
+            f"hits={stats['hits']} misses={stats['misses']} "
+            f"hit_rate={stats['hit_rate']:.2%}"
+        )
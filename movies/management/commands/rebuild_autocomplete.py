@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from movies.autocomplete import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the Redis title prefix index used by movie_autocomplete/."
+
+    def handle(self, *args, **options):
+        indexed = rebuild_index()
+        self.stdout.write(
+            self.style.SUCCESS(f"Indexed {indexed} movies for autocomplete.")
+        )
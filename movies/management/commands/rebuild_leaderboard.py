@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from movies.leaderboard import rebuild
+
+
+class Command(BaseCommand):
+    help = "Repopulate the Redis popularity leaderboard from the Movie table."
+
+    def handle(self, *args, **options):
+        count = rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f"Loaded {count} movies into the leaderboard.")
+        )
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from movies.caching import bump_catalog_version
+from movies.leaderboard import rebuild as rebuild_leaderboard
+from movies.models import Movie, Rating, rating_aggregates
+from movies.rating_buffer import flush_rating_buffer
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the running vote sum/count of movies from the Rating table "
+        "and re-rank them by weighted rating."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--movie",
+            type=int,
+            action="append",
+            dest="movie_ids",
+            help="Only rebuild the given movie id (can be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        movies = Movie.objects.all()
+        if options["movie_ids"]:
+            movies = movies.filter(id__in=options["movie_ids"])
+
+        ratings = Rating.objects.filter(movie=OuterRef("pk")).order_by().values("movie")
+        vote_sum = ratings.annotate(total=Sum("score")).values("total")
+        vote_count = ratings.annotate(total=Count("id")).values("total")
+
+        # Apply buffered write-behind votes first; they are already in the
+        # Rating table, so a later flush would count them a second time.
+        flush_rating_buffer()
+        with transaction.atomic():
+            updated = movies.update(
+                vote_sum=Coalesce(Subquery(vote_sum), 0),
+                vote_count=Coalesce(Subquery(vote_count), 0),
+            )
+            movies.update(**rating_aggregates(F("vote_sum"), F("vote_count")))
+            Movie.objects.update_weighted_ratings(settings.WEIGHTED_RATING_MIN_VOTES)
+            bump_catalog_version()
+        rebuild_leaderboard()
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt rating aggregates for {updated} movies.")
+        )
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from movies.caching import drop_cached_histograms
+from movies.models import ScoreHistogram
+from movies.rating_buffer import flush_rating_buffer
+
+
+class Command(BaseCommand):
+    help = "Recount the per-movie 1-10 score histograms from the Rating table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--movie",
+            type=int,
+            action="append",
+            dest="movie_ids",
+            help="Only rebuild the given movie id (can be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        # Buffered votes are already counted by the recount; apply them now so
+        # a later flush does not add them again.
+        flush_rating_buffer()
+        with transaction.atomic():
+            rebuilt = ScoreHistogram.objects.rebuild(options["movie_ids"])
+            drop_cached_histograms(options["movie_ids"])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt score histograms for {rebuilt} movies.")
+        )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from movies.recommendations import train_recommender
+
+
+class Command(BaseCommand):
+    help = "Factorize all ratings and publish new recommendation factors."
+
+    def handle(self, *args, **options):
+        stats = train_recommender()
+        self.stdout.write(self.style.SUCCESS(f"Recommender trained: {stats}"))
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.19 on 2026-10-18 15:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("movies", "0002_remove_movie_category_movie_categories"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="movie",
+            index=models.Index(
+                fields=["-popularity", "-id"], name="movie_popularity_id_idx"
+            ),
+        ),
+    ]
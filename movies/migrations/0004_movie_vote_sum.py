@@ -0,0 +1,35 @@
+# Generated by Django 4.2.19 on 2026-10-18 15:13
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_vote_sum(apps, schema_editor):
+    Movie = apps.get_model("movies", "Movie")
+    Rating = apps.get_model("movies", "Rating")
+
+    totals = (
+        Rating.objects.filter(movie=OuterRef("pk"))
+        .order_by()
+        .values("movie")
+        .annotate(total=Sum("score"))
+        .values("total")
+    )
+    Movie.objects.update(vote_sum=Coalesce(Subquery(totals), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("movies", "0003_movie_popularity_id_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="movie",
+            name="vote_sum",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_vote_sum, migrations.RunPython.noop),
+    ]
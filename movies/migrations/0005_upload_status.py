@@ -0,0 +1,51 @@
+# Generated by Django 4.2.19 on 2026-10-18 15:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("movies", "0004_movie_vote_sum"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="pending_uploads",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="category",
+            name="upload_status",
+            field=models.CharField(
+                choices=[
+                    ("none", "No upload"),
+                    ("pending", "Pending"),
+                    ("done", "Done"),
+                    ("failed", "Failed"),
+                ],
+                default="none",
+                max_length=10,
+            ),
+        ),
+        migrations.AddField(
+            model_name="movie",
+            name="pending_uploads",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="movie",
+            name="upload_status",
+            field=models.CharField(
+                choices=[
+                    ("none", "No upload"),
+                    ("pending", "Pending"),
+                    ("done", "Done"),
+                    ("failed", "Failed"),
+                ],
+                default="none",
+                max_length=10,
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.19 on 2026-10-18 15:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("movies", "0005_upload_status"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="movie",
+            index=models.Index(
+                fields=["title", "release_date"], name="movie_title_release_idx"
+            ),
+        ),
+    ]
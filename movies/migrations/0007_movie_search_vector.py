@@ -0,0 +1,41 @@
+# Generated by Django 4.2.19 on 2026-10-18 15:24
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def backfill_search_vector(apps, schema_editor):
+    Movie = apps.get_model("movies", "Movie")
+    config = settings.SEARCH_CONFIG
+    Movie.objects.update(
+        search_vector=SearchVector("title", weight="A", config=config)
+        + SearchVector("original_title", weight="B", config=config)
+        + SearchVector("overview", weight="C", config=config)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("movies", "0006_movie_title_release_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="movie",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="movie",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="movie_search_vector_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_search_vector, migrations.RunPython.noop),
+    ]
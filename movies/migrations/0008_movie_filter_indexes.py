@@ -0,0 +1,31 @@
+# Generated by Django 4.2.19 on 2026-10-18 15:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("movies", "0007_movie_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="movie",
+            index=models.Index(
+                fields=["original_language", "-popularity", "-id"],
+                name="movie_lang_popularity_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="movie",
+            index=models.Index(
+                fields=["adult", "-popularity", "-id"],
+                name="movie_adult_popularity_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="movie",
+            index=models.Index(fields=["release_date"], name="movie_release_date_idx"),
+        ),
+    ]
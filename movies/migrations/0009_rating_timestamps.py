@@ -0,0 +1,27 @@
+# Generated by Django 4.2.19 on 2026-10-18 19:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("movies", "0008_movie_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="rating",
+            name="created_at",
+            field=models.DateTimeField(
+                auto_now_add=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="rating",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
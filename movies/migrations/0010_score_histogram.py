@@ -0,0 +1,58 @@
+# Generated by Django 4.2.19 on 2026-10-18 15:35
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+import django.db.models.deletion
+
+
+def backfill_score_histograms(apps, schema_editor):
+    Rating = apps.get_model("movies", "Rating")
+    ScoreHistogram = apps.get_model("movies", "ScoreHistogram")
+
+    counts = {
+        f"score_{score}": Count("id", filter=Q(score=score)) for score in range(1, 11)
+    }
+    rows = Rating.objects.order_by().values("movie").annotate(**counts)
+    batch = []
+    for row in rows.iterator(chunk_size=2000):
+        batch.append(ScoreHistogram(movie_id=row.pop("movie"), **row))
+        if len(batch) == 2000:
+            ScoreHistogram.objects.bulk_create(batch)
+            batch = []
+    ScoreHistogram.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("movies", "0009_rating_timestamps"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScoreHistogram",
+            fields=[
+                (
+                    "movie",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="score_histogram",
+                        serialize=False,
+                        to="movies.movie",
+                    ),
+                ),
+                ("score_1", models.IntegerField(default=0)),
+                ("score_2", models.IntegerField(default=0)),
+                ("score_3", models.IntegerField(default=0)),
+                ("score_4", models.IntegerField(default=0)),
+                ("score_5", models.IntegerField(default=0)),
+                ("score_6", models.IntegerField(default=0)),
+                ("score_7", models.IntegerField(default=0)),
+                ("score_8", models.IntegerField(default=0)),
+                ("score_9", models.IntegerField(default=0)),
+                ("score_10", models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_score_histograms, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.19 on 2026-10-18 15:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("movies", "0010_score_histogram"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MovieNeighbor",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("similarity", models.FloatField()),
+                (
+                    "movie",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="neighbors",
+                        to="movies.movie",
+                    ),
+                ),
+                (
+                    "neighbor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="movies.movie",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["movie", "-similarity"],
+                        name="movie_neighbor_similarity_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="movieneighbor",
+            constraint=models.UniqueConstraint(
+                fields=("movie", "neighbor"), name="movie_neighbor_unique"
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.19 on 2026-10-18 15:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("movies", "0011_movie_neighbor"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customuser",
+            name="token_version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.19 on 2026-10-18 16:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("movies", "0012_customuser_token_version"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="category",
+            name="cover_url",
+            field=models.URLField(blank=True, max_length=255, null=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.19 on 2026-10-18 16:20
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("movies", "0013_category_cover_url"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="movie",
+            index=models.Index(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("title"),
+                    name="text_pattern_ops",
+                ),
+                name="movie_title_upper_prefix_idx",
+            ),
+        ),
+    ]
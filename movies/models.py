@@ -1,7 +1,15 @@
-from cloudinary.models import CloudinaryField
+from django.conf import settings
+from django.contrib.auth.hashers import check_password
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import connections, models, router
+from django.db.models import F
+from django.db.models.functions import Cast, Coalesce, NullIf, Round, Upper
+from django.db.models.sql import UpdateQuery
+
+from .caching import drop_cached_user
 
 
 class CustomUserManager(BaseUserManager):
@@ -29,6 +37,8 @@ class CustomUser(AbstractBaseUser):
     is_staff = models.BooleanField(default=False)
     is_superuser = models.BooleanField(default=False)
     date_joined = models.DateTimeField(auto_now_add=True)
+    # Carried in issued tokens; bumping it revokes every token issued before.
+    token_version = models.PositiveIntegerField(default=0)
 
     objects = CustomUserManager()
 
@@ -49,6 +59,34 @@ class CustomUser(AbstractBaseUser):
     def __str__(self):
         return self.username
 
+    def set_password(self, raw_password):
+        super().set_password(raw_password)
+        if self.pk is not None:
+            self.token_version += 1
+
+    def check_password(self, raw_password):
+        # Same as AbstractBaseUser.check_password, except that re-hashing the
+        # unchanged password with the preferred hasher keeps the token version.
+        def setter(raw_password):
+            AbstractBaseUser.set_password(self, raw_password)
+            self._password = None
+            self.save(update_fields=["password"])
+
+        return check_password(raw_password, self.password, setter)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "password" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "token_version"}
+        super().save(*args, **kwargs)
+        # A password change bumps the version by one, so the entry cached
+        # under the previous version goes too.
+        drop_cached_user(self.pk, {max(self.token_version - 1, 0), self.token_version})
+
+    def delete(self, *args, **kwargs):
+        drop_cached_user(self.pk, {max(self.token_version - 1, 0), self.token_version})
+        return super().delete(*args, **kwargs)
+
     def has_perm(self, perm, obj=None):
         return self.is_superuser
 
@@ -56,6 +94,78 @@ class CustomUser(AbstractBaseUser):
         return self.is_superuser
 
 
+class UploadStatus(models.TextChoices):
+    NONE = "none", "No upload"
+    PENDING = "pending", "Pending"
+    DONE = "done", "Done"
+    FAILED = "failed", "Failed"
+
+
+RATING_FIELDS = ["vote_sum", "vote_count", "vote_average"]
+
+
+def rating_aggregates(vote_sum, vote_count):
+    """Column expressions deriving the vote columns from a rating sum and count."""
+    vote_average = Coalesce(
+        Round(Cast(vote_sum, models.FloatField()) / NullIf(vote_count, 0), 2),
+        0.0,
+    )
+    return {
+        "vote_sum": vote_sum,
+        "vote_count": vote_count,
+        "vote_average": vote_average,
+    }
+
+
+def weighted_rating(mean, min_votes):
+    """
+    IMDb-style Bayesian rating: the movie's average pulled towards the global
+    ``mean`` until it has well over ``min_votes`` votes.
+    """
+    return Round((F("vote_sum") + min_votes * mean) / (F("vote_count") + min_votes), 4)
+
+
+SEARCH_FIELDS = {"title", "original_title", "overview"}
+
+
+def movie_search_vector():
+    """Weighted tsvector of a movie: title A, original title B, overview C."""
+    config = settings.SEARCH_CONFIG
+    return (
+        SearchVector("title", weight="A", config=config)
+        + SearchVector("original_title", weight="B", config=config)
+        + SearchVector("overview", weight="C", config=config)
+    )
+
+
+class MovieQuerySet(models.QuerySet):
+    def update_search_vectors(self):
+        return self.update(search_vector=movie_search_vector())
+
+    def update_weighted_ratings(self, min_votes):
+        """
+        Store the weighted rating of every movie in ``popularity`` with one
+        aggregate query for the global mean and one UPDATE of changed rows.
+        Returns the ``(id, popularity)`` pairs of the rows it changed.
+        """
+        totals = self.model.objects.aggregate(
+            vote_sum=models.Sum("vote_sum"), vote_count=models.Sum("vote_count")
+        )
+        mean = (
+            totals["vote_sum"] / totals["vote_count"] if totals["vote_count"] else 0.0
+        )
+        rating = weighted_rating(mean, min_votes)
+
+        # QuerySet.update() only returns a count; add RETURNING to its SQL.
+        query = self.exclude(popularity=rating).query.chain(UpdateQuery)
+        query.add_update_values({"popularity": rating})
+        using = router.db_for_write(self.model)
+        sql, params = query.get_compiler(using).as_sql()
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'{sql} RETURNING "id", "popularity"', params)
+            return cursor.fetchall()
+
+
 class Movie(models.Model):
     title = models.CharField(max_length=255)
     original_title = models.CharField(max_length=255)
@@ -65,10 +175,16 @@ class Movie(models.Model):
     popularity = models.FloatField(default=0)
     vote_average = models.FloatField(default=0)
     vote_count = models.IntegerField(default=0)
+    vote_sum = models.BigIntegerField(default=0)
     poster_path = models.URLField(blank=True, null=True)
     backdrop_path = models.URLField(blank=True, null=True)
     video = models.BooleanField(default=False)
     adult = models.BooleanField(default=False)
+    upload_status = models.CharField(
+        max_length=10, choices=UploadStatus.choices, default=UploadStatus.NONE
+    )
+    pending_uploads = models.PositiveSmallIntegerField(default=0)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     categories = models.ManyToManyField(
         "Category",
@@ -76,22 +192,63 @@ class Movie(models.Model):
         blank=True,
     )
 
+    objects = MovieQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-popularity", "-id"], name="movie_popularity_id_idx"),
+            models.Index(
+                fields=["title", "release_date"], name="movie_title_release_idx"
+            ),
+            GinIndex(fields=["search_vector"], name="movie_search_vector_idx"),
+            models.Index(
+                fields=["original_language", "-popularity", "-id"],
+                name="movie_lang_popularity_idx",
+            ),
+            models.Index(
+                fields=["adult", "-popularity", "-id"],
+                name="movie_adult_popularity_idx",
+            ),
+            models.Index(fields=["release_date"], name="movie_release_date_idx"),
+            # Serves title__istartswith, which filters on UPPER(title::text).
+            models.Index(
+                OpClass(Upper("title"), name="text_pattern_ops"),
+                name="movie_title_upper_prefix_idx",
+            ),
+        ]
+
     def __str__(self):
         return self.title
 
-    def update_ratings(self):
-        ratings = self.ratings.all()
-        self.vote_count = ratings.count()
-        self.vote_average = round(
-            ratings.aggregate(models.Avg("score"))["score__avg"] or 0, 2
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or SEARCH_FIELDS & set(update_fields):
+            Movie.objects.filter(pk=self.pk).update_search_vectors()
+
+    def apply_rating_delta(self, score_delta, count_delta):
+        """
+        Shift the vote columns by a single rating change in one UPDATE.
+
+        ``score_delta`` is the change to the sum of scores (the new score for
+        a first vote, ``new - old`` for a re-rate, ``-old`` for a removal) and
+        ``count_delta`` the change to the number of votes.
+        """
+        Movie.objects.filter(pk=self.pk).update(
+            **rating_aggregates(
+                F("vote_sum") + score_delta, F("vote_count") + count_delta
+            )
         )
-        self.popularity = (self.vote_average * self.vote_count) / (self.vote_count + 10)
-        self.save()
+        self.refresh_from_db(fields=RATING_FIELDS)
 
 
 class Category(models.Model):
     category_name = models.CharField(max_length=255, unique=True)
-    cover_url = CloudinaryField("category_covers", null=True, blank=True)
+    cover_url = models.URLField(max_length=255, blank=True, null=True)
+    upload_status = models.CharField(
+        max_length=10, choices=UploadStatus.choices, default=UploadStatus.NONE
+    )
+    pending_uploads = models.PositiveSmallIntegerField(default=0)
 
     class Meta:
         db_table = "movies_category"
@@ -108,9 +265,107 @@ class Rating(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     movie = models.ForeignKey("Movie", on_delete=models.CASCADE, related_name="ratings")
     score = models.IntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ("user", "movie")
 
     def __str__(self):
         return f"{self.user.username} → {self.movie.title} ({self.score}/10)"
+
+
+SCORES = range(1, 11)
+
+
+def histogram_field(score):
+    return f"score_{score}"
+
+
+def histogram_counts():
+    """``Count`` aggregates of ``Rating`` rows per score, keyed by column name."""
+    return {
+        histogram_field(score): models.Count("id", filter=models.Q(score=score))
+        for score in SCORES
+    }
+
+
+class ScoreHistogramQuerySet(models.QuerySet):
+    def add_votes(self, movie_id, votes):
+        """Shift the counters of one movie by ``{score: delta}`` in one UPDATE."""
+        changes = {
+            histogram_field(score): F(histogram_field(score)) + delta
+            for score, delta in votes.items()
+            if delta
+        }
+        if not changes:
+            return
+        if not self.filter(movie_id=movie_id).update(**changes):
+            self.bulk_create([ScoreHistogram(movie_id=movie_id)], ignore_conflicts=True)
+            self.filter(movie_id=movie_id).update(**changes)
+
+    def rebuild(self, movie_ids=None, batch_size=2000):
+        """Recount the histograms of ``movie_ids`` (or every movie) from ratings."""
+        ratings = Rating.objects.order_by()
+        if movie_ids:
+            ratings = ratings.filter(movie_id__in=movie_ids)
+            self.filter(movie_id__in=movie_ids).delete()
+        else:
+            self.all().delete()
+
+        rows = ratings.values("movie").annotate(**histogram_counts())
+        rebuilt = 0
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(ScoreHistogram(movie_id=row.pop("movie"), **row))
+            if len(batch) == batch_size:
+                rebuilt += len(self.bulk_create(batch))
+                batch = []
+        rebuilt += len(self.bulk_create(batch))
+        return rebuilt
+
+
+class ScoreHistogram(models.Model):
+    """Number of ratings per score (1-10) of a movie, kept in step with votes."""
+
+    movie = models.OneToOneField(
+        Movie,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="score_histogram",
+    )
+    score_1 = models.IntegerField(default=0)
+    score_2 = models.IntegerField(default=0)
+    score_3 = models.IntegerField(default=0)
+    score_4 = models.IntegerField(default=0)
+    score_5 = models.IntegerField(default=0)
+    score_6 = models.IntegerField(default=0)
+    score_7 = models.IntegerField(default=0)
+    score_8 = models.IntegerField(default=0)
+    score_9 = models.IntegerField(default=0)
+    score_10 = models.IntegerField(default=0)
+
+    objects = ScoreHistogramQuerySet.as_manager()
+
+    def counts(self):
+        return {score: getattr(self, histogram_field(score)) for score in SCORES}
+
+
+class MovieNeighbor(models.Model):
+    """A movie's nearest neighbour by rating cosine similarity."""
+
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name="neighbors")
+    neighbor = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name="+")
+    similarity = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["movie", "neighbor"], name="movie_neighbor_unique"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["movie", "-similarity"], name="movie_neighbor_similarity_idx"
+            ),
+        ]
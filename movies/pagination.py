@@ -0,0 +1,126 @@
+import base64
+import binascii
+import json
+
+from django.db.models import BooleanField, F, Field, Func, Value
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class Row(Func):
+    """A row constructor, ``(a, b)``, for comparing composite keys."""
+
+    template = "(%(expressions)s)"
+    output_field = Field()
+
+
+def row_compare(operator, left, right):
+    """
+    ``(left) <operator> (right)`` over two ``Row`` values. Postgres compares
+    rows lexicographically and can seek a matching composite index with it,
+    which the equivalent OR of column comparisons cannot.
+    """
+    return Func(
+        left,
+        right,
+        arg_joiner=f" {operator} ",
+        template="%(expressions)s",
+        output_field=BooleanField(),
+    )
+
+
+def encode_cursor(movie, direction):
+    payload = {"p": movie.popularity, "id": movie.id, "d": direction}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        popularity = float(payload["p"])
+        movie_id = int(payload["id"])
+        direction = payload["d"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidCursor("Invalid cursor.")
+
+    if direction not in ("next", "prev"):
+        raise InvalidCursor("Invalid cursor.")
+    return popularity, movie_id, direction
+
+
+class CursorPage:
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Paginates a queryset by ``(-popularity, -id)`` without COUNT or OFFSET.
+
+    Every page is an index range scan on ``movie_popularity_id_idx`` starting
+    from the row encoded in the cursor, so deep pages cost the same as page 1.
+    """
+
+    ordering = ("-popularity", "-id")
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def get_page(self, token=None):
+        if not token:
+            rows = list(self.queryset.order_by(*self.ordering)[: self.per_page + 1])
+            return self._build_page(rows, has_more=len(rows) > self.per_page)
+
+        popularity, movie_id, direction = decode_cursor(token)
+
+        key = Row(F("popularity"), F("id"))
+        cursor_key = Row(Value(popularity), Value(movie_id))
+
+        if direction == "next":
+            rows = list(
+                self.queryset.filter(row_compare("<", key, cursor_key)).order_by(
+                    *self.ordering
+                )[: self.per_page + 1]
+            )
+            return self._build_page(
+                rows, has_more=len(rows) > self.per_page, has_previous=True
+            )
+
+        rows = list(
+            self.queryset.filter(row_compare(">", key, cursor_key)).order_by(
+                "popularity", "id"
+            )[: self.per_page + 1]
+        )
+        has_previous = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        rows.reverse()
+        return self._build_page(rows, has_more=True, has_previous=has_previous)
+
+    def _build_page(self, rows, has_more, has_previous=False):
+        rows = rows[: self.per_page]
+        next_cursor = None
+        previous_cursor = None
+        if rows and has_more:
+            next_cursor = encode_cursor(rows[-1], "next")
+        if rows and has_previous:
+            previous_cursor = encode_cursor(rows[0], "prev")
+        return CursorPage(rows, next_cursor, previous_cursor)
@@ -0,0 +1,134 @@
+import logging
+from collections import deque
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django_redis import get_redis_connection
+
+from .caching import bump_catalog_version, drop_cached_histograms
+from .leaderboard import drop_payloads
+from .models import SCORES, Movie, ScoreHistogram, histogram_field, rating_aggregates
+
+logger = logging.getLogger(__name__)
+
+BUFFER_KEY = "rating_buffer:{movie_id}"
+DIRTY_KEY = "rating_buffer:dirty"
+
+
+def record_rating_change(movie, old_score, new_score):
+    """
+    Record a user's rating of ``movie`` moving from ``old_score`` to
+    ``new_score``, either of which is None when there is no rating.
+    """
+    votes = {}
+    if old_score is not None:
+        votes[old_score] = -1
+    if new_score is not None:
+        votes[new_score] = votes.get(new_score, 0) + 1
+    record_rating_delta(
+        movie,
+        (new_score or 0) - (old_score or 0),
+        (new_score is not None) - (old_score is not None),
+        votes,
+    )
+
+
+def record_rating_delta(movie, score_delta, count_delta, votes=None):
+    """
+    Apply a rating change to ``movie`` and its ``{score: delta}`` histogram
+    votes or, when ``RATING_WRITE_BEHIND`` is on, buffer it in Redis once the
+    surrounding transaction commits.
+
+    Buffered deltas reach the movie row on the next ``flush_rating_buffer``
+    run, so vote columns may lag by up to ``RATING_BUFFER_FLUSH_INTERVAL``.
+    """
+    votes = votes or {}
+    if not settings.RATING_WRITE_BEHIND:
+        movie.apply_rating_delta(score_delta, count_delta)
+        ScoreHistogram.objects.add_votes(movie.pk, votes)
+        drop_payloads([movie.pk])
+        drop_cached_histograms([movie.pk])
+        bump_catalog_version()
+        return
+
+    transaction.on_commit(
+        lambda: buffer_rating_delta(movie.pk, score_delta, count_delta, votes)
+    )
+
+
+def buffer_rating_delta(movie_id, score_delta, count_delta, votes=None):
+    conn = get_redis_connection("default")
+    key = BUFFER_KEY.format(movie_id=movie_id)
+
+    pipe = conn.pipeline()
+    pipe.hincrby(key, "sum", score_delta)
+    pipe.hincrby(key, "count", count_delta)
+    for score, delta in (votes or {}).items():
+        if delta:
+            pipe.hincrby(key, histogram_field(score), delta)
+    pipe.sadd(DIRTY_KEY, movie_id)
+    pipe.execute()
+
+
+def flush_rating_buffer(batch_size=500):
+    """
+    Write every buffered movie's accumulated deltas with one UPDATE each.
+
+    If a movie fails, its deltas go back into the buffer and the error is
+    raised once the rest of the popped batch is marked dirty again and the
+    movies already written have had their caches invalidated.
+    """
+    conn = get_redis_connection("default")
+    flushed = []
+    pending = deque()
+
+    try:
+        while True:
+            pending = deque(int(m) for m in conn.spop(DIRTY_KEY, batch_size) or [])
+            if not pending:
+                break
+            while pending:
+                if _flush_movie(conn, pending[0]):
+                    flushed.append(pending[0])
+                pending.popleft()
+    finally:
+        if pending:
+            conn.sadd(DIRTY_KEY, *pending)
+        if flushed:
+            drop_payloads(flushed)
+            drop_cached_histograms(flushed)
+            bump_catalog_version()
+    return len(flushed)
+
+
+def _flush_movie(conn, movie_id):
+    """Move one movie's buffered deltas to its row; False if there were none."""
+    key = BUFFER_KEY.format(movie_id=movie_id)
+
+    pipe = conn.pipeline()
+    pipe.hgetall(key)
+    pipe.delete(key)
+    deltas, _ = pipe.execute()
+
+    score_delta = int(deltas.get(b"sum", 0))
+    count_delta = int(deltas.get(b"count", 0))
+    votes = {
+        score: int(deltas.get(histogram_field(score).encode(), 0)) for score in SCORES
+    }
+    if not score_delta and not count_delta and not any(votes.values()):
+        return False
+
+    try:
+        with transaction.atomic():
+            Movie.objects.filter(pk=movie_id).update(
+                **rating_aggregates(
+                    F("vote_sum") + score_delta, F("vote_count") + count_delta
+                )
+            )
+            ScoreHistogram.objects.add_votes(movie_id, votes)
+    except Exception as e:
+        logger.error(f"Rating buffer flush failed for movie {movie_id}: {e}")
+        buffer_rating_delta(movie_id, score_delta, count_delta, votes)
+        raise
+    return True
@@ -0,0 +1,260 @@
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+
+import numpy as np
+from django.conf import settings
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+CURRENT_LINK = "current"
+FOLDED_KEY = "recommender:{generation}:folded"
+# Generations kept on disk; workers may still map the previous one.
+KEEP_GENERATIONS = 2
+
+
+def solve_rows(matrix, fixed, regularization, memory_bytes):
+    """
+    One ALS half-step: the least-squares factors of every row of ``matrix``
+    given the ``fixed`` factors of its columns, with weighted-lambda
+    regularization.
+
+    Each row's Gram matrix is the sum of ``v v^T`` over its rated columns, so
+    the upper triangles of all of them come from one sparse product of the
+    rating pattern with the column-wise outer products of ``fixed``. Rows and
+    outer-product columns are processed in chunks of about ``memory_bytes``.
+    """
+    n_rows, n_factors = matrix.shape[0], fixed.shape[1]
+    upper, lower = np.triu_indices(n_factors)
+    # Position in the packed upper triangle of every cell of a Gram matrix.
+    cells = np.empty((n_factors, n_factors), dtype=np.intp)
+    cells[upper, lower] = cells[lower, upper] = np.arange(len(upper))
+    cells = cells.ravel()
+    diagonal = np.arange(n_factors) * (n_factors + 1)
+
+    pattern = matrix.copy()
+    pattern.data = np.ones_like(pattern.data)
+    counts = np.diff(matrix.indptr)
+    rhs = matrix @ fixed
+
+    half = memory_bytes // 2
+    pair_chunk = max(1, half // (fixed.shape[0] * 4))
+    row_chunk = max(1, half // ((len(upper) + n_factors * n_factors) * 4))
+
+    result = np.zeros((n_rows, n_factors), dtype=np.float32)
+    for start in range(0, n_rows, row_chunk):
+        end = min(start + row_chunk, n_rows)
+        rated = counts[start:end] > 0
+        if not rated.any():
+            continue
+
+        block = pattern[start:end][rated]
+        packed = np.empty((block.shape[0], len(upper)), dtype=np.float32)
+        for first in range(0, len(upper), pair_chunk):
+            last = first + pair_chunk
+            outer = fixed[:, upper[first:last]] * fixed[:, lower[first:last]]
+            packed[:, first:last] = block @ outer
+
+        gram = np.take(packed, cells, axis=1)
+        gram[:, diagonal] += regularization * counts[start:end][rated, None]
+        gram = gram.reshape(-1, n_factors, n_factors)
+        solved = np.linalg.solve(gram, rhs[start:end][rated, :, None])[..., 0]
+        result[start:end][rated] = solved
+    return result
+
+
+def train(matrix, factors, iterations, regularization, memory_bytes, seed=0):
+    """Factorize a users x items CSR matrix of centred scores with ALS."""
+    rng = np.random.default_rng(seed)
+    users = rng.normal(0, 0.1, (matrix.shape[0], factors)).astype(np.float32)
+    items = rng.normal(0, 0.1, (matrix.shape[1], factors)).astype(np.float32)
+    item_matrix = matrix.T.tocsr()
+    for _ in range(iterations):
+        users = solve_rows(matrix, items, regularization, memory_bytes)
+        items = solve_rows(item_matrix, users, regularization, memory_bytes)
+    return users, items
+
+
+def train_recommender():
+    """
+    Factorize every rating and publish the factors as a new generation of
+    memory-mappable ``.npy`` files under ``RECOMMENDER_DIR``.
+    """
+    from .similarity import build_item_matrix, load_ratings
+
+    started = time.monotonic()
+    user_ids, movie_ids, scores = load_ratings()
+    if not len(scores):
+        return {"ratings": 0}
+
+    mean = float(scores.mean())
+    item_matrix, item_index = build_item_matrix(user_ids, movie_ids, scores - mean)
+    user_index = np.unique(user_ids)
+    users, items = train(
+        item_matrix.T.tocsr(),
+        factors=settings.RECOMMENDER_FACTORS,
+        iterations=settings.RECOMMENDER_ITERATIONS,
+        regularization=settings.RECOMMENDER_REGULARIZATION,
+        memory_bytes=settings.RECOMMENDER_BLOCK_MEMORY,
+    )
+
+    generation = f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+    publish(
+        generation,
+        {
+            "user_ids": user_index,
+            "users": users,
+            "item_ids": item_index,
+            "items": items,
+        },
+        {"mean": mean, "regularization": settings.RECOMMENDER_REGULARIZATION},
+    )
+
+    stats = {
+        "ratings": len(scores),
+        "users": len(user_index),
+        "movies": len(item_index),
+        "generation": generation,
+        "seconds": round(time.monotonic() - started, 3),
+    }
+    logger.info(f"Recommender trained: {stats}")
+    return stats
+
+
+def publish(generation, arrays, meta):
+    root = settings.RECOMMENDER_DIR
+    directory = os.path.join(root, generation)
+    os.makedirs(directory)
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, f"{name}.npy"), array)
+    with open(os.path.join(directory, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    link = os.path.join(root, f".{generation}.link")
+    os.symlink(generation, link)
+    os.replace(link, os.path.join(root, CURRENT_LINK))
+
+    generations = sorted(
+        name
+        for name in os.listdir(root)
+        if not name.startswith(".") and name != CURRENT_LINK
+    )
+    for name in generations[:-KEEP_GENERATIONS]:
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+class FactorModel:
+    """Read-only, memory-mapped factors of one published generation."""
+
+    def __init__(self, generation):
+        directory = os.path.join(settings.RECOMMENDER_DIR, generation)
+        self.generation = generation
+        for name in ("user_ids", "users", "item_ids", "items"):
+            path = os.path.join(directory, f"{name}.npy")
+            setattr(self, name, np.load(path, mmap_mode="r"))
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        self.mean = meta["mean"]
+        self.regularization = meta["regularization"]
+
+    def trained_vector(self, user_id):
+        position = np.searchsorted(self.user_ids, user_id)
+        if position < len(self.user_ids) and self.user_ids[position] == user_id:
+            return np.asarray(self.users[position])
+        return None
+
+    def fold_in(self, scores):
+        """Solve one user's factors from ``{movie_id: score}`` and fixed items."""
+        movie_ids = np.fromiter(scores, dtype=np.int64, count=len(scores))
+        positions = self.item_positions(movie_ids)
+        known = positions >= 0
+        if not known.any():
+            return None
+
+        vectors = np.asarray(self.items[positions[known]])
+        values = np.fromiter(scores.values(), dtype=np.float32)[known] - self.mean
+        gram = vectors.T @ vectors
+        gram += self.regularization * len(vectors) * np.eye(len(gram))
+        return np.linalg.solve(gram, vectors.T @ values).astype(np.float32)
+
+    def item_positions(self, movie_ids):
+        """Row of each movie in ``items``, or -1 for movies without factors."""
+        positions = np.searchsorted(self.item_ids, movie_ids)
+        positions = np.minimum(positions, len(self.item_ids) - 1)
+        return np.where(self.item_ids[positions] == movie_ids, positions, -1)
+
+    def recommend(self, vector, exclude, k):
+        """Top ``k`` movie ids by dot product, skipping ``exclude`` ids."""
+        scores = np.asarray(self.items) @ vector
+        positions = self.item_positions(np.asarray(list(exclude), dtype=np.int64))
+        scores[positions[positions >= 0]] = -np.inf
+
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k < 1:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return self.item_ids[top].tolist()
+
+
+_model = None
+
+
+def get_model():
+    """The current generation's factors, re-mapped when a new one is published."""
+    global _model
+    try:
+        generation = os.readlink(os.path.join(settings.RECOMMENDER_DIR, CURRENT_LINK))
+    except FileNotFoundError:
+        return None
+    if _model is None or _model.generation != generation:
+        _model = FactorModel(generation)
+    return _model
+
+
+def fold_in_user(user_id, scores):
+    """
+    Store factors for ``user_id`` solved from their current ``scores`` so
+    new ratings count before the next retrain.
+    """
+    model = get_model()
+    if model is None:
+        return False
+
+    key = FOLDED_KEY.format(generation=model.generation)
+    conn = get_redis_connection("default")
+    vector = model.fold_in(scores) if scores else None
+    if vector is None:
+        conn.hdel(key, user_id)
+        return False
+
+    pipe = conn.pipeline()
+    pipe.hset(key, user_id, vector.tobytes())
+    pipe.expire(key, settings.RECOMMENDER_FOLD_IN_TIMEOUT)
+    pipe.execute()
+    return True
+
+
+def recommend(user_id, exclude, k):
+    """
+    Movie ids recommended to ``user_id``, or None without a model or factors
+    for the user. Folded-in factors win over the trained ones.
+    """
+    model = get_model()
+    if model is None:
+        return None
+
+    folded = get_redis_connection("default").hget(
+        FOLDED_KEY.format(generation=model.generation), user_id
+    )
+    if folded is not None:
+        vector = np.frombuffer(folded, dtype=np.float32)
+    else:
+        vector = model.trained_vector(user_id)
+    if vector is None:
+        return None
+    return model.recommend(vector, exclude, k)
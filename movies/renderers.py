@@ -0,0 +1,63 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+PLAIN_TYPES = {str, int, bool, type(None)}
+
+
+def has_unsafe_float(values):
+    """
+    Whether any float in ``values`` (searched recursively) is one orjson
+    formats differently from ``json``: zero and magnitudes in [1e-4, 1e16)
+    print the same shortest form in both, anything else (exponents, NaN,
+    infinity) does not.
+    """
+    for value in values:
+        kind = type(value)
+        if kind in PLAIN_TYPES:
+            continue
+        if isinstance(value, float):
+            if not (value == 0 or 1e-4 <= abs(value) < 1e16):
+                return True
+        elif isinstance(value, dict):
+            if has_unsafe_float(value.values()):
+                return True
+        elif isinstance(value, (list, tuple)):
+            if has_unsafe_float(value):
+                return True
+    return False
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson and returns the same bytes.
+
+    Dates, times, decimals and other non-JSON types still go through DRF's
+    encoder. Anything orjson would write differently (indented output, floats
+    outside the range both format alike, non-string keys, integers past 64
+    bits) is rendered by JSONRenderer itself.
+    """
+
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            data is None
+            or self.ensure_ascii
+            or not self.compact
+            or not self.strict
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+            or has_unsafe_float((data,))
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data, default=self.encoder_class().default, option=self.options
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Like JSONRenderer, escape the line terminators JavaScript rejects.
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+# Seconds the replica is behind the primary: 0 on a primary or a replica that
+# has replayed everything it received, otherwise the age of the last replayed
+# transaction (infinite until it has replayed one).
+LAG_QUERY = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(
+        EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()),
+        'Infinity'
+    )
+END
+"""
+
+_replica_reads = ContextVar("replica_reads", default=False)
+_pinned_to_primary = ContextVar("pinned_to_primary", default=False)
+_lag_checks = {}
+
+
+@contextmanager
+def replica_reads():
+    """Let reads in this block go to a replica until the first write."""
+    reads = _replica_reads.set(True)
+    pinned = _pinned_to_primary.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(reads)
+        _pinned_to_primary.reset(pinned)
+
+
+@contextmanager
+def primary_reads():
+    """
+    Send reads in this block to the primary, even inside ``replica_reads``.
+    Use it for anything that fills a cache: a lagging replica would store
+    stale rows under a key that claims to be current.
+    """
+    pinned = _pinned_to_primary.set(True)
+    try:
+        yield
+    finally:
+        _pinned_to_primary.reset(pinned)
+
+
+def read_from_replica(view):
+    """Run a view (or view method), sync or async, with ``replica_reads`` on."""
+    if asyncio.iscoroutinefunction(view):
+
+        @wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            with replica_reads():
+                return await view(*args, **kwargs)
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with replica_reads():
+            return view(*args, **kwargs)
+
+    return wrapper
+
+
+def replica_is_fresh(alias):
+    """
+    Whether ``alias`` lags the primary by at most ``REPLICA_MAX_LAG`` seconds.
+    The answer is kept for ``REPLICA_LAG_CHECK_INTERVAL`` seconds per process;
+    an unreachable replica counts as stale.
+    """
+    now = time.monotonic()
+    checked = _lag_checks.get(alias)
+    if checked is not None and now - checked[0] < settings.REPLICA_LAG_CHECK_INTERVAL:
+        return checked[1]
+
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(LAG_QUERY)
+            lag = float(cursor.fetchone()[0])
+    except DatabaseError as e:
+        logger.warning(f"Replica {alias} is unavailable: {e}")
+        lag = float("inf")
+    fresh = lag <= settings.REPLICA_MAX_LAG
+    _lag_checks[alias] = (now, fresh)
+    return fresh
+
+
+class ReplicaRouter:
+    """
+    Send reads inside ``replica_reads`` to a random fresh replica from
+    ``DATABASE_REPLICAS``, and everything else to the primary. A write pins
+    the rest of the block to the primary so it reads its own writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get() or _pinned_to_primary.get():
+            return DEFAULT_DB_ALIAS
+        replicas = [
+            alias for alias in settings.DATABASE_REPLICAS if replica_is_fresh(alias)
+        ]
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if _replica_reads.get():
+            _pinned_to_primary.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
@@ -1,13 +1,16 @@
-import base64
-import logging
-
+from celery import group
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 
-from .models import Category, CustomUser, Movie, Rating
-from .utils import decode_and_upload_to_cloudinary
+from .models import Category, CustomUser, Movie, Rating, UploadStatus
+from .rating_buffer import record_rating_change
+from .tasks import fold_in_user, upload_movie_image
+from .trending import record_vote
+from .user_ratings import set_user_score
+from .utils import discard_staged_image, stage_base64_image, stage_uploaded_image
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -63,7 +66,32 @@ class LoginSerializer(serializers.Serializer):
         return data
 
 
+def stage_images(data, inputs):
+    """
+    Pop each image's file or base64 input from ``data`` and stage it on disk.
+
+    ``inputs`` maps a target name to its ``(file_field, base64_field)`` pair.
+    Returns ``{target: staged_path}``; on error nothing is left staged.
+    """
+    staged = {}
+    for target, (file_field, base64_field) in inputs.items():
+        uploaded = data.pop(file_field, None)
+        encoded = data.pop(base64_field, None)
+        try:
+            if uploaded:
+                staged[target] = stage_uploaded_image(uploaded)
+            elif encoded:
+                staged[target] = stage_base64_image(encoded)
+        except ValueError as e:
+            for path in staged.values():
+                discard_staged_image(path)
+            raise serializers.ValidationError({file_field: str(e)})
+    return staged
+
+
 class MovieCreateSerializer(serializers.ModelSerializer):
+    poster = serializers.FileField(write_only=True, required=False)
+    backdrop = serializers.FileField(write_only=True, required=False)
     poster_base64 = serializers.CharField(write_only=True, required=False)
     backdrop_base64 = serializers.CharField(write_only=True, required=False)
     categories = serializers.PrimaryKeyRelatedField(
@@ -83,37 +111,41 @@ class MovieCreateSerializer(serializers.ModelSerializer):
             "video",
             "adult",
             "categories",
+            "poster",
+            "backdrop",
             "poster_base64",
             "backdrop_base64",
         ]
 
+    def validate(self, data):
+        data["images"] = stage_images(
+            data,
+            {
+                "poster_path": ("poster", "poster_base64"),
+                "backdrop_path": ("backdrop", "backdrop_base64"),
+            },
+        )
+        return data
+
     def create(self, validated_data):
         categories_data = validated_data.pop("categories", [])
-        poster_base64 = validated_data.pop("poster_base64", None)
-        backdrop_base64 = validated_data.pop("backdrop_base64", None)
+        images = validated_data.pop("images", {})
+
+        if images:
+            validated_data["upload_status"] = UploadStatus.PENDING
+            validated_data["pending_uploads"] = len(images)
 
         movie = Movie.objects.create(**validated_data)
 
         if categories_data:
             movie.categories.set(categories_data)
 
-        try:
-            if poster_base64:
-                movie.poster_path = decode_and_upload_to_cloudinary(
-                    base64_str=poster_base64,
-                    folder_name="movies/posters",
-                    file_name=f"movie_{movie.id}_poster",
-                )
-            if backdrop_base64:
-                movie.backdrop_path = decode_and_upload_to_cloudinary(
-                    base64_str=backdrop_base64,
-                    folder_name="movies/backdrops",
-                    file_name=f"movie_{movie.id}_backdrop",
-                )
-            movie.save()
-        except ValueError as e:
-            movie.delete()
-            raise serializers.ValidationError(str(e))
+        if images:
+            uploads = group(
+                upload_movie_image.s(movie.id, field, path)
+                for field, path in images.items()
+            )
+            transaction.on_commit(uploads.apply_async)
 
         return movie
 
@@ -148,21 +180,132 @@ class MovieListSerializer(serializers.ModelSerializer):
             "rating",
         ]
 
+    # Movie columns of the payload, as read by ``from_values``.
+    VALUE_FIELDS = [
+        "adult",
+        "backdrop_path",
+        "id",
+        "original_language",
+        "original_title",
+        "overview",
+        "popularity",
+        "poster_path",
+        "release_date",
+        "title",
+        "video",
+        "vote_average",
+        "vote_count",
+    ]
+
     def get_genre_ids(self, obj):
+        genre_map = self.context.get("genre_map")
+        if genre_map is not None:
+            return genre_map.get(obj.id, [])
         return list(obj.categories.values_list("id", flat=True))
 
     def get_rating(self, obj):
+        rating_map = self.context.get("rating_map")
+        if rating_map is not None:
+            return rating_map.get(obj.id, 0)
         request = self.context.get("request")
         if request and request.user.is_authenticated:
             rating = obj.ratings.filter(user=request.user).first()
             return rating.score if rating else 0
         return 0
 
+    @staticmethod
+    def build_context(request, movies, with_ratings=True):
+        """
+        Load genre ids and the caller's scores for a page in one query each.
+        ``movies`` are instances or ``.values()`` rows.
+
+        With ``with_ratings=False`` every ``rating`` is 0, giving the shared
+        payload that callers overlay per user.
+        """
+        movie_ids = [
+            movie["id"] if isinstance(movie, dict) else movie.id for movie in movies
+        ]
+
+        genre_map = {movie_id: [] for movie_id in movie_ids}
+        category_links = Movie.categories.through.objects.filter(
+            movie_id__in=movie_ids
+        ).order_by("category_id")
+        for movie_id, category_id in category_links.values_list(
+            "movie_id", "category_id"
+        ):
+            genre_map[movie_id].append(category_id)
+
+        rating_map = {}
+        if with_ratings and request and request.user.is_authenticated and movie_ids:
+            rating_map = dict(
+                Rating.objects.filter(
+                    user=request.user, movie_id__in=movie_ids
+                ).values_list("movie_id", "score")
+            )
+
+        return {"request": request, "genre_map": genre_map, "rating_map": rating_map}
+
     def to_representation(self, instance):
         representation = super().to_representation(instance)
         representation["vote_average"] = round(representation["vote_average"], 2)
         return representation
 
+    @staticmethod
+    def from_values(rows, context):
+        """
+        Build the payloads ``.data`` would for ``Movie.objects.values(
+        *VALUE_FIELDS)`` rows, without DRF's per-field work. Database values
+        already have the types the fields would coerce them to.
+        """
+        genre_map = context["genre_map"]
+        rating_map = context["rating_map"]
+        return [
+            {
+                "adult": row["adult"],
+                "backdrop_path": row["backdrop_path"],
+                "genre_ids": genre_map.get(row["id"], []),
+                "id": row["id"],
+                "original_language": row["original_language"],
+                "original_title": row["original_title"],
+                "overview": row["overview"],
+                "popularity": row["popularity"],
+                "poster_path": row["poster_path"],
+                "release_date": row["release_date"].isoformat(),
+                "title": row["title"],
+                "video": row["video"],
+                "vote_average": round(row["vote_average"], 2),
+                "vote_count": row["vote_count"],
+                "rating": rating_map.get(row["id"], 0),
+            }
+            for row in rows
+        ]
+
+
+class MovieFilterSerializer(serializers.Serializer):
+    categories = serializers.CharField(required=False)
+    language = serializers.CharField(required=False, max_length=10)
+    release_from = serializers.DateField(required=False)
+    release_to = serializers.DateField(required=False)
+    adult = serializers.BooleanField(required=False, allow_null=True, default=None)
+    facets = serializers.BooleanField(required=False, default=False)
+
+    def validate_categories(self, value):
+        try:
+            return sorted({int(category_id) for category_id in value.split(",")})
+        except ValueError:
+            raise serializers.ValidationError("Categories must be comma-separated ids.")
+
+    def validate(self, data):
+        if (
+            data.get("release_from")
+            and data.get("release_to")
+            and data["release_from"] > data["release_to"]
+        ):
+            raise serializers.ValidationError(
+                "release_from must not be after release_to."
+            )
+        return data
+
 
 class CreateCategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -170,26 +313,17 @@ class CreateCategorySerializer(serializers.ModelSerializer):
         fields = ["category_name"]
 
 
-logger = logging.getLogger(__name__)
-
-
 class CreateCategoryCoverSerializer(serializers.Serializer):
     category_id = serializers.IntegerField()
-    cover_base64 = serializers.CharField()
+    cover = serializers.FileField(required=False)
+    cover_base64 = serializers.CharField(required=False)
 
-    def validate_cover_base64(self, value):
-        try:
-            if value.startswith("data:image"):
-                value = value.split("base64,")[1]
-
-            if len(value) % 4 != 0:
-                value += "=" * (4 - len(value) % 4)
-
-            base64.b64decode(value)
-        except Exception as e:
-            logger.error(f"Base64 validation error: {e}")
-            raise serializers.ValidationError("Invalid base64 content.")
-        return value
+    def validate(self, data):
+        if not data.get("cover") and not data.get("cover_base64"):
+            raise serializers.ValidationError("A cover image is required.")
+        staged = stage_images(data, {"cover": ("cover", "cover_base64")})
+        data["cover_path"] = staged["cover"]
+        return data
 
 
 class RatingSerializer(serializers.ModelSerializer):
@@ -209,9 +343,36 @@ class RatingSerializer(serializers.ModelSerializer):
 
         score = round(score, 2)
 
-        rating, created = Rating.objects.update_or_create(
-            user=user, movie=movie, defaults={"score": score}
-        )
+        with transaction.atomic():
+            rating = self.locked_rating(user, movie)
+            created = False
+            if rating is None:
+                rating, created = self.create_rating(user, movie, score)
+            if created:
+                record_rating_change(movie, None, score)
+            else:
+                old_score = rating.score
+                rating.score = score
+                rating.save(update_fields=["score", "updated_at"])
+                record_rating_change(movie, old_score, score)
+            set_user_score(user.id, movie.id, score)
+            record_vote(movie.id)
+            transaction.on_commit(lambda: fold_in_user.delay(user.id))
 
-        movie.update_ratings()
         return rating
+
+    @staticmethod
+    def locked_rating(user, movie):
+        return Rating.objects.select_for_update().filter(user=user, movie=movie).first()
+
+    def create_rating(self, user, movie, score):
+        """
+        Create the user's first rating of ``movie``. If a concurrent first vote
+        created it after our lookup, lock and return that row instead so the
+        caller treats this vote as a re-rate.
+        """
+        try:
+            with transaction.atomic():
+                return Rating.objects.create(user=user, movie=movie, score=score), True
+        except IntegrityError:
+            return self.locked_rating(user, movie), False
@@ -0,0 +1,144 @@
+import logging
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from scipy import sparse
+
+from .models import MovieNeighbor, Rating
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 100_000
+WRITE_BATCH_SIZE = 5000
+# Bytes per cell of a similarity block: the sparse product (value and column
+# index) plus the dense copy the top-K selection runs on.
+BYTES_PER_CELL = 16
+
+
+def load_ratings(chunk_size=CHUNK_SIZE):
+    """Stream ``Rating`` into ``(user_ids, movie_ids, scores)`` arrays."""
+    rows = (
+        Rating.objects.order_by()
+        .values_list("user_id", "movie_id", "score")
+        .iterator(chunk_size=chunk_size)
+    )
+    chunks = []
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == chunk_size:
+            chunks.append(np.array(batch, dtype=np.int64))
+            batch = []
+    if batch:
+        chunks.append(np.array(batch, dtype=np.int64))
+    if not chunks:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=np.float32)
+
+    ratings = np.concatenate(chunks)
+    return ratings[:, 0], ratings[:, 1], ratings[:, 2].astype(np.float32)
+
+
+def build_item_matrix(user_ids, movie_ids, scores):
+    """
+    Return a movies x users CSR matrix of scores and the movie id of each row.
+    """
+    movie_index, rows = np.unique(movie_ids, return_inverse=True)
+    user_index, columns = np.unique(user_ids, return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (scores, (rows, columns)),
+        shape=(len(movie_index), len(user_index)),
+        dtype=np.float32,
+    )
+    return matrix, movie_index
+
+
+def normalize_rows(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    scale = np.divide(1, norms, out=np.zeros_like(norms), where=norms > 0)
+    return sparse.diags(scale.astype(np.float32)) @ matrix
+
+
+def block_rows(n_movies, memory_bytes):
+    """How many movies fit in one similarity block of ``memory_bytes``."""
+    return max(1, memory_bytes // (max(n_movies, 1) * BYTES_PER_CELL))
+
+
+def top_k_neighbors(matrix, k, block_size):
+    """
+    Yield ``(rows, neighbors, similarities)`` arrays with the ``k`` most
+    cosine-similar rows of every row of ``matrix``, ``block_size`` rows at a
+    time. Pairs without a shared rater are left out.
+    """
+    n_movies = matrix.shape[0]
+    k = min(k, n_movies - 1)
+    if k < 1:
+        return
+
+    normalized = normalize_rows(matrix).tocsr()
+    transposed = normalized.T.tocsc()
+
+    for start in range(0, n_movies, block_size):
+        end = min(start + block_size, n_movies)
+        block = (normalized[start:end] @ transposed).toarray()
+        rows = np.arange(end - start)
+        block[rows, rows + start] = 0
+
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        similarities = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-similarities, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        similarities = np.take_along_axis(similarities, order, axis=1)
+
+        keep = similarities > 0
+        yield (
+            np.repeat(rows + start, k).reshape(-1, k)[keep],
+            top[keep],
+            similarities[keep],
+        )
+
+
+def compute_similar_movies(k=None, memory_bytes=None):
+    """
+    Replace ``MovieNeighbor`` with the top-``k`` cosine neighbours of every
+    rated movie, computed from the full rating matrix in memory-bounded
+    blocks.
+    """
+    k = k or settings.SIMILAR_MOVIES_TOP_K
+    memory_bytes = memory_bytes or settings.SIMILAR_MOVIES_BLOCK_MEMORY
+    started = time.monotonic()
+
+    matrix, movie_index = build_item_matrix(*load_ratings())
+    loaded = time.monotonic()
+
+    block_size = block_rows(matrix.shape[0], memory_bytes)
+    written = 0
+    with transaction.atomic():
+        MovieNeighbor.objects.all().delete()
+        for rows, neighbors, similarities in top_k_neighbors(matrix, k, block_size):
+            pairs = zip(
+                movie_index[rows].tolist(),
+                movie_index[neighbors].tolist(),
+                similarities.tolist(),
+            )
+            batch = [
+                MovieNeighbor(movie_id=movie_id, neighbor_id=neighbor_id, similarity=s)
+                for movie_id, neighbor_id, s in pairs
+            ]
+            for start in range(0, len(batch), WRITE_BATCH_SIZE):
+                end = start + WRITE_BATCH_SIZE
+                MovieNeighbor.objects.bulk_create(batch[start:end])
+            written += len(batch)
+
+    stats = {
+        "ratings": int(matrix.nnz),
+        "movies": int(matrix.shape[0]),
+        "users": int(matrix.shape[1]),
+        "neighbors": written,
+        "load_seconds": round(loaded - started, 3),
+        "seconds": round(time.monotonic() - started, 3),
+    }
+    logger.info(f"Similar movies computed: {stats}")
+    return stats
@@ -0,0 +1,142 @@
+import logging
+
+from celery import shared_task
+from django.conf import settings
+from django.db.models import F
+
+from .autocomplete import rebuild_index
+from .caching import bump_catalog_version
+from .importer import CatalogImporter
+from .leaderboard import drop_payloads
+from .leaderboard import is_ready as leaderboard_is_ready
+from .leaderboard import rebuild as rebuild_leaderboard
+from .leaderboard import record_popularity
+from .models import Category, Movie, UploadStatus
+from .rating_buffer import flush_rating_buffer as flush_buffer
+from .recommendations import fold_in_user as fold_in
+from .recommendations import train_recommender as train_factors
+from .trending import update_trending as materialize_trending
+from .user_ratings import get_all_user_scores
+from .utils import discard_staged_image, get_image_uploader
+
+logger = logging.getLogger(__name__)
+
+MOVIE_IMAGE_FOLDERS = {
+    "poster_path": ("movies/posters", "poster"),
+    "backdrop_path": ("movies/backdrops", "backdrop"),
+}
+
+
+@shared_task
+def flush_rating_buffer():
+    return flush_buffer()
+
+
+@shared_task
+def update_weighted_ratings():
+    """
+    Re-rank the catalog by weighted rating and move the changed movies in
+    the leaderboard, rebuilding it only when Redis has lost it.
+    """
+    changed = Movie.objects.update_weighted_ratings(settings.WEIGHTED_RATING_MIN_VOTES)
+    if not leaderboard_is_ready():
+        rebuild_leaderboard()
+    elif changed:
+        record_popularity(dict(changed))
+    if changed:
+        bump_catalog_version()
+    return len(changed)
+
+
+@shared_task
+def update_trending():
+    return materialize_trending()
+
+
+@shared_task
+def compute_similar_movies():
+    # SciPy is only needed by the batch jobs; keep it out of web processes.
+    from .similarity import compute_similar_movies as compute_neighbors
+
+    return compute_neighbors()
+
+
+@shared_task
+def train_recommender():
+    return train_factors()
+
+
+@shared_task
+def fold_in_user(user_id):
+    return fold_in(user_id, get_all_user_scores(user_id))
+
+
+@shared_task
+def rebuild_autocomplete_index():
+    return rebuild_index()
+
+
+@shared_task
+def upload_movie_image(movie_id, field, path):
+    folder_name, suffix = MOVIE_IMAGE_FOLDERS[field]
+    _upload(
+        Movie.objects.filter(pk=movie_id),
+        field,
+        path,
+        folder_name=folder_name,
+        file_name=f"movie_{movie_id}_{suffix}",
+    )
+    drop_payloads([movie_id])
+
+
+@shared_task
+def upload_category_cover(category_id, path):
+    categories = Category.objects.filter(pk=category_id)
+    try:
+        # The category may have been deleted while the upload was queued.
+        name = categories.values_list("category_name", flat=True).first()
+        if name is not None:
+            _upload(
+                categories,
+                "cover_url",
+                path,
+                folder_name="category_covers",
+                file_name=f"category_{category_id}_{name}",
+            )
+    finally:
+        discard_staged_image(path)
+
+
+@shared_task
+def import_catalog(path, fmt):
+    try:
+        return CatalogImporter().run(path, fmt)
+    finally:
+        discard_staged_image(path)
+
+
+def _upload(queryset, field, path, folder_name, file_name):
+    """
+    Upload one staged image, store its URL on the row and delete the file.
+
+    Rows with several uploads in flight count them down in ``pending_uploads``
+    and only turn ``done`` after the last one, or ``failed`` after any error.
+    """
+    try:
+        url = get_image_uploader()(
+            path=path, folder_name=folder_name, file_name=file_name
+        )
+    except ValueError as e:
+        logger.error(f"Image upload {file_name} failed: {e}")
+        queryset.update(
+            upload_status=UploadStatus.FAILED, pending_uploads=F("pending_uploads") - 1
+        )
+        return
+    finally:
+        discard_staged_image(path)
+
+    queryset.update(**{field: url}, pending_uploads=F("pending_uploads") - 1)
+    queryset.filter(upload_status=UploadStatus.PENDING, pending_uploads=0).update(
+        upload_status=UploadStatus.DONE
+    )
+    bump_catalog_version()
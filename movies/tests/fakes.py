@@ -0,0 +1,13 @@
+from ..utils import read_image_format
+
+uploads = []
+failing_folders = set()
+
+
+def fake_upload(path, folder_name, file_name):
+    """Offline stand-in for upload_image_to_cloudinary."""
+    if folder_name in failing_folders:
+        raise ValueError("Failed to upload image to Cloudinary.")
+    extension = read_image_format(path)
+    uploads.append((folder_name, file_name))
+    return f"https://res.cloudinary.com/test/{folder_name}/{file_name}.{extension}"
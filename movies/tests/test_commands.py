@@ -0,0 +1,131 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+import numpy as np
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..importer import CatalogImporter
+from ..models import Category, Movie
+from ..similarity import build_item_matrix, top_k_neighbors
+
+
+def write_file(directory, name, content):
+    path = os.path.join(directory, name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    return path
+
+
+class ImportCatalogTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        Category.objects.create(category_name="Drama")
+
+    def jsonl(self, records):
+        lines = "\n".join(json.dumps(record) for record in records)
+        return write_file(self.tmp.name, "catalog.jsonl", lines + "\n")
+
+    def test_imports_jsonl_with_categories(self):
+        path = self.jsonl(
+            [
+                {
+                    "title": "Alpha",
+                    "release_date": "2001-02-03",
+                    "vote_average": 7.5,
+                    "vote_count": 10,
+                    "genres": ["Drama", "Horror"],
+                },
+                {"title": "Alpha", "release_date": "2001-02-03"},
+                {"title": "", "release_date": "2001-02-03"},
+                {"title": "Beta", "release_date": "1999-12-31", "adult": True},
+            ]
+        )
+        out = StringIO()
+
+        call_command("import_catalog", path, stdout=out)
+
+        self.assertIn("Imported 2 movies (1 duplicates, 1 invalid)", out.getvalue())
+        alpha = Movie.objects.get(title="Alpha")
+        self.assertEqual(alpha.vote_sum, 75)
+        self.assertEqual(
+            sorted(alpha.categories.values_list("category_name", flat=True)),
+            ["Drama", "Horror"],
+        )
+        self.assertTrue(Movie.objects.get(title="Beta").adult)
+
+    def test_imports_csv_and_skips_existing_movies(self):
+        path = write_file(
+            self.tmp.name,
+            "catalog.csv",
+            "title,release_date,categories,video\n"
+            "Gamma,2010-01-01,Drama|Comedy,true\n"
+            "Delta,2011-01-01,,false\n",
+        )
+
+        CatalogImporter().run(path)
+        stats = CatalogImporter().run(path)
+
+        self.assertEqual(stats["inserted"], 0)
+        self.assertEqual(stats["skipped"], 2)
+        self.assertEqual(Movie.objects.count(), 2)
+        self.assertTrue(Movie.objects.get(title="Gamma").video)
+
+    def test_resumes_from_checkpoint(self):
+        path = self.jsonl(
+            [{"title": f"Movie {i}", "release_date": "2020-01-01"} for i in range(5)]
+        )
+        checkpoint = os.path.join(self.tmp.name, "checkpoint.json")
+        with open(checkpoint, "w") as f:
+            json.dump({"records": 3}, f)
+
+        stats = CatalogImporter(batch_size=2, checkpoint_path=checkpoint).run(path)
+
+        self.assertEqual(stats["inserted"], 2)
+        self.assertEqual(
+            sorted(Movie.objects.values_list("title", flat=True)),
+            ["Movie 3", "Movie 4"],
+        )
+        with open(checkpoint) as f:
+            self.assertEqual(json.load(f), {"records": 5})
+
+
+class SimilarMoviesTests(TestCase):
+    def test_blocks_match_brute_force_cosine(self):
+        rng = np.random.default_rng(1)
+        dense = rng.integers(0, 11, size=(12, 30)) * (rng.random((12, 30)) < 0.4)
+        movie_ids, user_ids = np.nonzero(dense)
+        matrix, _ = build_item_matrix(
+            user_ids, movie_ids, dense[movie_ids, user_ids].astype(np.float32)
+        )
+
+        norms = np.linalg.norm(dense, axis=1)
+        expected = dense @ dense.T / np.outer(norms, norms)
+        np.fill_diagonal(expected, 0)
+
+        found = {}
+        for rows, neighbors, similarities in top_k_neighbors(matrix, 3, 5):
+            for row, neighbor, similarity in zip(rows, neighbors, similarities):
+                found.setdefault(row, []).append((neighbor, similarity))
+
+        for row, pairs in found.items():
+            self.assertEqual(len(pairs), 3)
+            best = np.sort(expected[row])[::-1][:3]
+            np.testing.assert_allclose([s for _, s in pairs], best, rtol=1e-5)
+            for neighbor, similarity in pairs:
+                self.assertAlmostEqual(expected[row, neighbor], similarity, places=5)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command(
+            "benchmark_similar_movies",
+            ratings=2000,
+            users=200,
+            movies=50,
+            top_k=5,
+            stdout=out,
+        )
+        self.assertIn("neighbors=250", out.getvalue())
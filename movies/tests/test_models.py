@@ -1,7 +1,16 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.test import TestCase
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django_redis import get_redis_connection
 
-from ..models import CustomUser
+from .. import leaderboard
+from ..models import CustomUser, Movie, Rating
+from ..tasks import update_weighted_ratings
 
 
 class CustomUserModelTests(TestCase):
@@ -39,3 +48,120 @@ class CustomUserModelTests(TestCase):
     def test_str_method(self):
         user = CustomUser.objects.create_user(**self.valid_user)
         self.assertEqual(str(user), self.valid_user["username"])
+
+
+class MovieRatingAggregateTests(TestCase):
+    def setUp(self):
+        self.movie = Movie.objects.create(
+            title="Movie",
+            original_title="Movie",
+            overview="Overview",
+            release_date=datetime.date(2020, 1, 1),
+        )
+        self.users = [
+            CustomUser.objects.create_user(
+                email=f"user{i}@example.com", username=f"user{i}", password="pass"
+            )
+            for i in range(3)
+        ]
+
+    def test_apply_rating_delta(self):
+        self.movie.apply_rating_delta(8, 1)
+        self.movie.apply_rating_delta(5, 1)
+        self.movie.apply_rating_delta(-2, 0)
+
+        self.assertEqual(self.movie.vote_sum, 11)
+        self.assertEqual(self.movie.vote_count, 2)
+        self.assertEqual(self.movie.vote_average, 5.5)
+
+    def test_apply_rating_delta_back_to_zero(self):
+        self.movie.apply_rating_delta(7, 1)
+        self.movie.apply_rating_delta(-7, -1)
+
+        self.assertEqual(self.movie.vote_count, 0)
+        self.assertEqual(self.movie.vote_average, 0)
+
+    def test_rebuild_rating_aggregates_command(self):
+        for user, score in zip(self.users, [10, 7, 3]):
+            Rating.objects.create(user=user, movie=self.movie, score=score)
+        Movie.objects.filter(pk=self.movie.pk).update(vote_sum=1, vote_count=99)
+
+        call_command("rebuild_rating_aggregates", stdout=StringIO())
+
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.vote_sum, 20)
+        self.assertEqual(self.movie.vote_count, 3)
+        self.assertEqual(self.movie.vote_average, 6.67)
+
+        # The rate endpoint's running deltas land on the same average.
+        replayed = Movie.objects.get(pk=self.movie.pk)
+        Movie.objects.filter(pk=replayed.pk).update(vote_sum=0, vote_count=0)
+        for score in [10, 7, 3]:
+            replayed.apply_rating_delta(score, 1)
+        self.assertEqual(replayed.vote_average, self.movie.vote_average)
+        # The only rated movie's weighted rating is the global mean.
+        self.assertAlmostEqual(self.movie.popularity, 20 / 3, places=4)
+
+
+@override_settings(WEIGHTED_RATING_MIN_VOTES=10)
+class WeightedRatingTests(TestCase):
+    def create_movie(self, title, vote_average, vote_count):
+        return Movie.objects.create(
+            title=title,
+            original_title=title,
+            overview="Overview",
+            release_date=datetime.date(2020, 1, 1),
+            vote_sum=round(vote_average * vote_count),
+            vote_count=vote_count,
+            vote_average=vote_average,
+            popularity=0,
+        )
+
+    def test_weighted_rating_pulls_few_votes_towards_mean(self):
+        one_vote = self.create_movie("One vote", 10, 1)
+        many_votes = self.create_movie("Many votes", 9, 100)
+        self.create_movie("Disliked", 5, 100)
+        unrated = self.create_movie("Unrated", 0, 0)
+
+        with self.assertNumQueries(2):
+            changed = Movie.objects.update_weighted_ratings(10)
+        self.assertEqual(
+            dict(changed), dict(Movie.objects.values_list("id", "popularity"))
+        )
+
+        mean = 1410 / 201
+        for movie in (one_vote, many_votes, unrated):
+            movie.refresh_from_db()
+        self.assertAlmostEqual(one_vote.popularity, (10 + 10 * mean) / 11, places=4)
+        self.assertAlmostEqual(many_votes.popularity, (900 + 10 * mean) / 110, places=4)
+        self.assertAlmostEqual(unrated.popularity, mean, places=4)
+        self.assertEqual(
+            list(Movie.objects.order_by("-popularity").values_list("title", flat=True)),
+            ["Many votes", "One vote", "Unrated", "Disliked"],
+        )
+
+    def test_task_skips_unchanged_rows(self):
+        self.create_movie("Movie", 7, 5)
+
+        self.assertEqual(update_weighted_ratings.delay().get(), 1)
+        self.assertEqual(update_weighted_ratings.delay().get(), 0)
+
+    def test_task_moves_only_changed_movies_in_leaderboard(self):
+        cache.clear()
+        rated = self.create_movie("Rated", 7, 5)
+        self.create_movie("Unrated", 0, 0)
+        update_weighted_ratings.delay()
+        self.assertTrue(leaderboard.is_ready())
+
+        Movie.objects.filter(pk=rated.pk).update(vote_sum=50)
+        with mock.patch("movies.tasks.rebuild_leaderboard") as rebuild:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(update_weighted_ratings.delay().get(), 2)
+        rebuild.assert_not_called()
+
+        conn = get_redis_connection("default")
+        rated.refresh_from_db()
+        self.assertEqual(
+            conn.zscore(leaderboard.LEADERBOARD_KEY, leaderboard.member(rated.pk)),
+            rated.popularity,
+        )
@@ -0,0 +1,130 @@
+import base64
+import datetime
+import decimal
+import os
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+
+from ..models import Category, CustomUser, Movie, Rating
+from ..renderers import ORJSONRenderer
+from ..serializers import CreateCategoryCoverSerializer, MovieListSerializer
+from ..utils import BASE64_CHUNK_SIZE, detect_image_format, stage_base64_image
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 1000
+
+
+class StageBase64ImageTests(TestCase):
+    def test_decodes_across_chunks(self):
+        encoded = base64.b64encode(PNG).decode().rstrip("=")
+        self.assertGreater(len(encoded), 2 * BASE64_CHUNK_SIZE)
+
+        path = stage_base64_image(f"data:image/png;base64,{encoded}")
+
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), PNG)
+        os.remove(path)
+
+    def test_ignores_line_breaks(self):
+        # MIME-style 76 character lines; with " \r\n" breaks, the chunk
+        # boundaries fall off the 4-character grid.
+        encoded = base64.encodebytes(PNG).decode().replace("\n", " \r\n")
+        self.assertGreater(len(encoded), 2 * BASE64_CHUNK_SIZE)
+
+        path = stage_base64_image(encoded)
+
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), PNG)
+        os.remove(path)
+
+    def test_detect_image_format(self):
+        self.assertEqual(detect_image_format(b"\xff\xd8\xff\xe0"), "jpg")
+        self.assertEqual(detect_image_format(PNG[:16]), "png")
+        self.assertEqual(detect_image_format(b"GIF87a"), "gif")
+        self.assertEqual(detect_image_format(b"RIFF\x00\x00\x00\x00WEBPVP8 "), "webp")
+        self.assertIsNone(detect_image_format(b"plain text"))
+
+
+class CreateCategoryCoverSerializerTests(TestCase):
+    def test_invalid_base64(self):
+        serializer = CreateCategoryCoverSerializer(
+            data={"category_id": 1, "cover_base64": "@@@@"}
+        )
+
+        self.assertFalse(serializer.is_valid())
+
+    def test_cover_is_required(self):
+        serializer = CreateCategoryCoverSerializer(data={"category_id": 1})
+
+        self.assertFalse(serializer.is_valid())
+
+
+class MovieListFastPathTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="test@example.com", username="testuser", password="pass12345"
+        )
+        drama = Category.objects.create(category_name="Drama")
+        values = [
+            ("Amélie", 'Le Fabuleux\u2028Destin\n"d\'Amélie"', 7.123456, 8.0),
+            ("Tiny", "Ünïcödé 😀 \\ \x01", 0.00001, 1e-7),
+            ("Huge", "Overview", 1e16, 123456789.987654),
+            ("Zero", "", 0.0, 0.0),
+        ]
+        for i, (title, overview, popularity, vote_average) in enumerate(values):
+            movie = Movie.objects.create(
+                title=title,
+                original_title=title,
+                overview=overview,
+                release_date=datetime.date(1999 + i, 12, 31),
+                popularity=popularity,
+                vote_average=vote_average,
+                vote_count=i,
+                poster_path="https://example.com/poster.jpg" if i % 2 else None,
+                adult=bool(i % 2),
+            )
+            movie.categories.set([drama])
+        Rating.objects.create(user=self.user, movie=movie, score=9)
+
+    def render_both(self, queryset, with_ratings):
+        request = mock.Mock(user=self.user)
+        movies = list(queryset.order_by("id"))
+        rows = list(queryset.order_by("id").values(*MovieListSerializer.VALUE_FIELDS))
+        serializer = MovieListSerializer(
+            movies,
+            many=True,
+            context=MovieListSerializer.build_context(request, movies, with_ratings),
+        )
+        fast = MovieListSerializer.from_values(
+            rows, MovieListSerializer.build_context(request, rows, with_ratings)
+        )
+
+        self.assertEqual(fast, serializer.data)
+        data = {"page": 1, "results": serializer.data}
+        return JSONRenderer().render(data), ORJSONRenderer().render(
+            {"page": 1, "results": fast}
+        )
+
+    def test_output_is_byte_identical(self):
+        # The orjson path, then the fallback for floats orjson prints differently.
+        plain = Movie.objects.exclude(title__in=["Tiny", "Huge"])
+        for queryset in (plain, Movie.objects.all()):
+            for with_ratings in (True, False):
+                expected, rendered = self.render_both(queryset, with_ratings)
+                self.assertEqual(rendered, expected)
+                self.assertIn(b"\\u2028", rendered)
+
+    def test_renderer_matches_json_renderer(self):
+        data = {
+            "floats": [0.1, 1e-4, 5e-5, 1e15, 1e16, -2.5],
+            "when": datetime.datetime(2024, 1, 2, 3, 4, 5, 678901),
+            "day": datetime.date(2024, 1, 2),
+            "amount": decimal.Decimal("1.50"),
+            "big": 2**70,
+            "keys": {1: "int key"},
+        }
+        for item in [data, *data.values()]:
+            self.assertEqual(ORJSONRenderer().render(item), JSONRenderer().render(item))
+        with self.assertRaises(ValueError):
+            ORJSONRenderer().render({"nan": float("nan")})
@@ -0,0 +1,1111 @@
+import base64
+import datetime
+import os
+import re
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django_redis import get_redis_connection
+from rest_framework.test import APIClient
+
+from .. import trending
+from ..caching import get_cache_stats, get_catalog_version
+from ..models import Category, CustomUser, Movie, Rating, ScoreHistogram
+from ..routers import replica_reads
+from ..serializers import RatingSerializer
+from ..tasks import (
+    compute_similar_movies,
+    flush_rating_buffer,
+    train_recommender,
+    update_trending,
+    update_weighted_ratings,
+)
+from ..throttles import THROTTLE_KEY, TokenBucketThrottle
+from ..user_ratings import USER_RATINGS_KEY, get_user_scores, set_user_score
+from ..views import hydrate_movie_payloads
+from . import fakes
+
+
+def create_movie(**kwargs):
+    defaults = {
+        "title": "Movie",
+        "original_title": "Movie",
+        "overview": "Overview",
+        "release_date": datetime.date(2020, 1, 1),
+    }
+    defaults.update(kwargs)
+    return Movie.objects.create(**defaults)
+
+
+class GetMoviesViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = "/movie_list/"
+        self.user = CustomUser.objects.create_user(
+            email="test@example.com", username="testuser", password="pass12345"
+        )
+        self.drama = Category.objects.create(category_name="Drama")
+        self.comedy = Category.objects.create(category_name="Comedy")
+
+    def create_movies(self, count):
+        for i in range(count):
+            movie = create_movie(title=f"Movie {i}", popularity=i)
+            movie.categories.set([self.drama, self.comedy])
+            Rating.objects.create(user=self.user, movie=movie, score=7)
+
+    def count_queries(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_genre_ids_and_rating_are_returned(self):
+        self.create_movies(1)
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get(self.url)
+
+        movie = response.data["results"][0]
+        self.assertEqual(movie["genre_ids"], [self.drama.id, self.comedy.id])
+        self.assertEqual(movie["rating"], 7)
+
+    def test_anonymous_rating_is_zero(self):
+        self.create_movies(1)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.data["results"][0]["rating"], 0)
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        self.client.force_authenticate(self.user)
+        self.create_movies(1)
+        single_count, _ = self.count_queries()
+
+        self.create_movies(9)
+        full_count, response = self.count_queries()
+
+        self.assertEqual(len(response.data["results"]), 10)
+        self.assertEqual(single_count, full_count)
+
+    async def test_served_asynchronously_under_asgi(self):
+        await sync_to_async(self.create_movies)(2)
+
+        movies = await self.async_client.get(self.url)
+        categories = await self.async_client.get("/category_list/")
+
+        titles = [movie["title"] for movie in movies.json()["results"]]
+        self.assertEqual(titles, ["Movie 1", "Movie 0"])
+        self.assertEqual(len(categories.json()["detail"]), 2)
+
+
+class GetMoviesCursorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = "/movie_list/"
+        self.user = CustomUser.objects.create_user(
+            email="test@example.com", username="testuser", password="pass12345"
+        )
+        self.client.force_authenticate(self.user)
+        for i in range(25):
+            create_movie(title=f"Movie {i}", popularity=i // 3)
+        self.expected = list(
+            Movie.objects.order_by("-popularity", "-id").values_list("id", flat=True)
+        )
+
+    def get_page(self, cursor):
+        response = self.client.get(self.url, {"cursor": cursor})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_walks_forward_and_back_in_order(self):
+        first = self.get_page("")
+        second = self.get_page(first["next"])
+        third = self.get_page(second["next"])
+
+        seen = [m["id"] for page in (first, second, third) for m in page["results"]]
+        self.assertEqual(seen, self.expected)
+        self.assertIsNone(first["previous"])
+        self.assertIsNone(third["next"])
+
+        back = self.get_page(third["previous"])
+        self.assertEqual(back["results"], second["results"])
+        self.assertEqual(self.get_page(back["previous"])["results"], first["results"])
+
+    def test_cursor_page_does_not_count_rows(self):
+        first = self.get_page("")
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.get_page(first["next"])
+
+        sql = " ".join(q["sql"] for q in ctx.captured_queries)
+        self.assertNotIn("COUNT(", sql.upper())
+        self.assertNotIn("OFFSET", sql.upper())
+
+    def test_cursor_seeks_into_popularity_index(self):
+        deep = self.get_page(self.get_page("")["next"])
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.get_page(deep["next"])
+            self.get_page(deep["previous"])
+
+        seeks = [
+            q["sql"]
+            for q in ctx.captured_queries
+            if re.search(r'"id"\) [<>] \(', q["sql"])
+        ]
+        self.assertEqual(len(seeks), 2)
+        with connection.cursor() as cursor:
+            # A 25-row table is cheaper to scan; make the planner show its index use.
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            for sql in seeks:
+                cursor.execute(f"EXPLAIN {sql}")
+                plan = "\n".join(row[0] for row in cursor.fetchall())
+                self.assertIn("movie_popularity_id_idx", plan)
+                self.assertRegex(plan, r"Index Cond: \(ROW\(popularity, id\) [<>]")
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {"cursor": "not-a-cursor"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.data["success"])
+
+
+class StaticFilesTests(TestCase):
+    def test_serves_static_files_without_debug(self):
+        response = self.client.get("/static/css/style.css")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], 'text/css; charset="utf-8"')
+
+
+class RateMovieViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = "/movie_rate/"
+        self.user = CustomUser.objects.create_user(
+            email="test@example.com", username="testuser", password="pass12345"
+        )
+        self.client.force_authenticate(self.user)
+        self.movie = create_movie()
+
+    def test_rate_rerate_and_remove(self):
+        self.client.post(self.url, {"movie": self.movie.id, "score": 8})
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.vote_sum, self.movie.vote_count), (8, 1))
+
+        self.client.post(self.url, {"movie": self.movie.id, "score": 4})
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.vote_sum, self.movie.vote_count), (4, 1))
+        self.assertEqual(self.movie.vote_average, 4)
+
+        response = self.client.delete(self.url, {"movie": self.movie.id})
+        self.assertEqual(response.status_code, 200)
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.vote_sum, self.movie.vote_count), (0, 0))
+        self.assertFalse(Rating.objects.exists())
+
+    def test_concurrent_first_vote_becomes_a_rerate(self):
+        # Another request's first vote commits between our lookup and insert.
+        rating = Rating.objects.create(user=self.user, movie=self.movie, score=5)
+        self.movie.apply_rating_delta(5, 1)
+        with mock.patch.object(
+            RatingSerializer, "locked_rating", side_effect=[None, rating]
+        ):
+            response = self.client.post(self.url, {"movie": self.movie.id, "score": 8})
+
+        self.assertLess(response.status_code, 300)
+        self.assertEqual(Rating.objects.get().score, 8)
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.vote_sum, self.movie.vote_count), (8, 1))
+
+    @override_settings(RATING_WRITE_BEHIND=True)
+    def test_write_behind_buffers_until_flush(self):
+        other = CustomUser.objects.create_user(
+            email="other@example.com", username="other", password="pass12345"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, {"movie": self.movie.id, "score": 8})
+        self.client.force_authenticate(other)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, {"movie": self.movie.id, "score": 6})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, {"movie": self.movie.id, "score": 2})
+
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.vote_count, 0)
+
+        self.assertEqual(flush_rating_buffer.delay().get(), 1)
+
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.vote_sum, self.movie.vote_count), (10, 2))
+        self.assertEqual(self.movie.vote_average, 5)
+        self.assertEqual(flush_rating_buffer.delay().get(), 0)
+
+    @override_settings(RATING_WRITE_BEHIND=True)
+    def test_failed_flush_keeps_the_rest_of_the_batch(self):
+        movies = [self.movie, create_movie(), create_movie()]
+        for movie in movies:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(self.url, {"movie": movie.id, "score": 8})
+        version = get_catalog_version()
+
+        # The first movie popped is written, the second fails, the third waits.
+        with mock.patch.object(
+            ScoreHistogram.objects,
+            "add_votes",
+            side_effect=[None, DatabaseError("boom")],
+        ):
+            with self.captureOnCommitCallbacks(execute=True):
+                with self.assertRaises(DatabaseError):
+                    flush_rating_buffer()
+
+        counts = sorted(Movie.objects.values_list("vote_count", flat=True))
+        self.assertEqual(counts, [0, 0, 1])
+        self.assertGreater(get_catalog_version(), version)
+
+        self.assertEqual(flush_rating_buffer.delay().get(), 2)
+        counts = Movie.objects.values_list("vote_count", flat=True)
+        self.assertEqual(list(counts), [1, 1, 1])
+
+    @override_settings(RATING_WRITE_BEHIND=True)
+    def test_rebuild_commands_do_not_double_count_buffered_votes(self):
+        for command in ("rebuild_rating_aggregates", "rebuild_score_histograms"):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(self.url, {"movie": self.movie.id, "score": 8})
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command(command, stdout=StringIO())
+            flush_rating_buffer()
+
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.vote_sum, self.movie.vote_count), (8, 1))
+        histogram = ScoreHistogram.objects.get(movie=self.movie)
+        self.assertEqual(histogram.score_8, 1)
+
+
+class MovieListCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = "/movie_list/"
+        create_movie(title="Cached", popularity=5)
+
+    def test_anonymous_page_is_cached_until_catalog_changes(self):
+        first = self.client.get(self.url)
+
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.get(self.url)
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(second.data, first.data)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/movie_add/",
+                {
+                    "title": "New",
+                    "original_title": "New",
+                    "overview": "Overview",
+                    "release_date": "2021-01-01",
+                },
+            )
+        self.assertEqual(response.status_code, 201)
+
+        third = self.client.get(self.url)
+        self.assertEqual(len(third.data["results"]), 2)
+        self.assertEqual(get_cache_stats()["hits"], 1)
+        self.assertEqual(get_cache_stats()["misses"], 2)
+
+    def test_authenticated_requests_share_cache_with_own_ratings(self):
+        movie = Movie.objects.get()
+        user = CustomUser.objects.create_user(
+            email="test@example.com", username="testuser", password="pass12345"
+        )
+        self.client.get(self.url)
+        self.client.force_authenticate(user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/movie_rate/", {"movie": movie.id, "score": 9})
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(response.data["results"][0]["rating"], 9)
+        self.assertEqual(response.data["results"][0]["vote_count"], 1)
+        self.assertEqual(get_cache_stats()["hits"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete("/movie_rate/", {"movie": movie.id})
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["results"][0]["rating"], 0)
+
+    def test_score_written_before_load_expires(self):
+        movie = Movie.objects.get()
+        user = CustomUser.objects.create_user(
+            email="test@example.com", username="testuser", password="pass12345"
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            set_user_score(user.id, movie.id, 9)
+
+        ttl = get_redis_connection("default").ttl(
+            USER_RATINGS_KEY.format(user_id=user.id)
+        )
+        self.assertGreater(ttl, 0)
+        self.assertLessEqual(ttl, settings.USER_RATINGS_CACHE_TIMEOUT)
+
+
+class ImageUploadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(
+            email="test@example.com", username="testuser", password="pass12345"
+        )
+        self.client.force_authenticate(self.user)
+        self.image = base64.b64encode(b"\x89PNG\r\n\x1a\n" + b"0" * 32).decode()
+
+    def add_movie(self, **images):
+        data = {
+            "title": "New",
+            "original_title": "New",
+            "overview": "Overview",
+            "release_date": "2021-01-01",
+            **images,
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/movie_add/", data)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["upload_status"], "pending")
+        return response.data["movie_id"]
+
+    def test_movie_images_are_uploaded_in_background(self):
+        movie_id = self.add_movie(poster_base64=self.image, backdrop_base64=self.image)
+
+        response = self.client.get(f"/movie_upload_status/{movie_id}/")
+
+        detail = response.data["detail"]
+        self.assertEqual(detail["upload_status"], "done")
+        self.assertTrue(detail["poster_path"].endswith(f"movie_{movie_id}_poster.png"))
+        self.assertTrue(
+            detail["backdrop_path"].endswith(f"movie_{movie_id}_backdrop.png")
+        )
+        self.assertEqual(os.listdir(settings.IMAGE_UPLOAD_DIR), [])
+
+    def test_multipart_image_upload(self):
+        poster = SimpleUploadedFile("poster.gif", b"GIF89a" + b"0" * 64)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/movie_add/",
+                {
+                    "title": "New",
+                    "original_title": "New",
+                    "overview": "Overview",
+                    "release_date": "2021-01-01",
+                    "poster": poster,
+                },
+                format="multipart",
+            )
+
+        movie = Movie.objects.get(id=response.data["movie_id"])
+        self.assertEqual(movie.upload_status, "done")
+        self.assertTrue(movie.poster_path.endswith("_poster.gif"))
+
+    def test_invalid_image_is_rejected(self):
+        response = self.client.post(
+            "/movie_add/",
+            {
+                "title": "New",
+                "original_title": "New",
+                "overview": "Overview",
+                "release_date": "2021-01-01",
+                "poster_base64": base64.b64encode(b"not an image").decode(),
+            },
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Movie.objects.exists())
+
+    @mock.patch.object(fakes, "failing_folders", {"movies/backdrops"})
+    def test_failed_upload_keeps_movie(self):
+        movie_id = self.add_movie(poster_base64=self.image, backdrop_base64=self.image)
+
+        movie = Movie.objects.get(id=movie_id)
+        self.assertEqual(movie.upload_status, "failed")
+        self.assertIsNotNone(movie.poster_path)
+        self.assertIsNone(movie.backdrop_path)
+
+    def test_category_cover_is_uploaded_in_background(self):
+        category = Category.objects.create(category_name="Drama")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/category_cover/",
+                {"category_id": category.id, "cover_base64": self.image},
+            )
+        self.assertEqual(response.status_code, 202)
+
+        response = self.client.get(f"/category_upload_status/{category.id}/")
+        self.assertEqual(response.data["detail"]["upload_status"], "done")
+        self.assertIn("category_", response.data["detail"]["cover_url"])
+
+    def test_overlapping_category_covers_count_every_upload(self):
+        category = Category.objects.create(category_name="Drama")
+
+        # Both requests land before either upload task runs.
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(2):
+                self.client.post(
+                    "/category_cover/",
+                    {"category_id": category.id, "cover_base64": self.image},
+                )
+                category.refresh_from_db()
+                self.assertEqual(category.upload_status, "pending")
+
+        category.refresh_from_db()
+        self.assertEqual(
+            (category.upload_status, category.pending_uploads), ("done", 0)
+        )
+
+    def test_cover_of_deleted_category_is_discarded(self):
+        category = Category.objects.create(category_name="Drama")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                "/category_cover/",
+                {"category_id": category.id, "cover_base64": self.image},
+            )
+            category.delete()
+
+        self.assertEqual(os.listdir(settings.IMAGE_UPLOAD_DIR), [])
+
+
+class SearchMoviesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = "/movie_search/"
+        create_movie(title="The Matrix", overview="A hacker learns about reality.")
+        create_movie(title="Heat", overview="A detective hunts a thief.")
+        create_movie(
+            title="Reality Bites", original_title="Reality Bites", overview="Twenty."
+        )
+
+    def test_title_matches_rank_above_overview_matches(self):
+        response = self.client.get(self.url, {"q": "reality"})
+
+        titles = [movie["title"] for movie in response.data["results"]]
+        self.assertEqual(titles, ["Reality Bites", "The Matrix"])
+        self.assertFalse(response.data["has_next"])
+
+    def test_search_vector_follows_updates(self):
+        movie = Movie.objects.get(title="Heat")
+        movie.overview = "A story about a heist."
+        movie.save()
+
+        response = self.client.get(self.url, {"q": "heist"})
+
+        self.assertEqual(response.data["results"][0]["id"], movie.id)
+
+    def test_query_is_required(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 400)
+
+
+class MovieListFilterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = "/movie_list/"
+        self.drama = Category.objects.create(category_name="Drama")
+        self.comedy = Category.objects.create(category_name="Comedy")
+        self.first = create_movie(title="First", release_date=datetime.date(1999, 5, 1))
+        self.first.categories.set([self.drama])
+        self.second = create_movie(
+            title="Second", original_language="fr", adult=True, popularity=2
+        )
+        self.second.categories.set([self.drama, self.comedy])
+        create_movie(title="Third", release_date=datetime.date(2010, 1, 1))
+
+    def titles(self, params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [movie["title"] for movie in response.data["results"]]
+
+    def test_filters(self):
+        self.assertEqual(
+            self.titles({"categories": f"{self.drama.id},{self.comedy.id}"}),
+            ["Second", "First"],
+        )
+        self.assertEqual(self.titles({"language": "fr"}), ["Second"])
+        self.assertEqual(
+            self.titles({"release_from": "2000-01-01", "adult": "false"}), ["Third"]
+        )
+
+    def test_facet_counts_use_one_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(
+                self.url, {"categories": str(self.drama.id), "facets": "true"}
+            )
+
+        facets = response.data["facets"]
+        self.assertEqual(facets["categories"], {self.drama.id: 2, self.comedy.id: 1})
+        self.assertEqual(facets["language"], {"en": 1, "fr": 1})
+        self.assertEqual(facets["year"], {1999: 1, 2020: 1})
+        self.assertEqual(facets["adult"], {True: 1, False: 1})
+        facet_queries = [q for q in ctx.captured_queries if "UNION" in q["sql"]]
+        self.assertEqual(len(facet_queries), 1)
+
+    def test_invalid_filter(self):
+        response = self.client.get(self.url, {"categories": "drama"})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class AutocompleteMoviesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = "/movie_autocomplete/"
+        create_movie(title="The Matrix", popularity=9)
+        create_movie(title="Matilda", original_title="Matilda", popularity=5)
+        create_movie(title="Amélie", original_title="Le Fabuleux Destin", popularity=7)
+        for i in range(15):
+            create_movie(title=f"Star {i}", popularity=i)
+
+    def suggest(self, query, **params):
+        response = self.client.get(self.url, {"q": query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [movie["title"] for movie in response.data["results"]]
+
+    def test_suggestions_from_prefix_index(self):
+        call_command("rebuild_autocomplete", stdout=StringIO())
+
+        self.assertEqual(self.suggest("mat"), ["The Matrix", "Matilda"])
+        self.assertEqual(self.suggest("ame"), ["Amélie"])
+        self.assertEqual(self.suggest("fabuleux"), ["Amélie"])
+        self.assertEqual(
+            self.suggest("star", limit=100), [f"Star {i}" for i in range(14, 4, -1)]
+        )
+
+    def test_new_movies_are_indexed(self):
+        call_command("rebuild_autocomplete", stdout=StringIO())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                "/movie_add/",
+                {
+                    "title": "Matchstick Men",
+                    "original_title": "Matchstick Men",
+                    "overview": "Overview",
+                    "release_date": "2003-09-12",
+                },
+            )
+
+        self.assertIn("Matchstick Men", self.suggest("match"))
+
+    def test_missing_index_falls_back_to_database_and_queues_one_rebuild(self):
+        with mock.patch("movies.tasks.rebuild_autocomplete_index.delay") as delay:
+            for _ in range(3):
+                self.assertEqual(self.suggest("the m"), ["The Matrix"])
+        delay.assert_called_once_with()
+
+    def test_missing_index_is_rebuilt_in_background(self):
+        self.assertEqual(self.suggest("fabuleux"), [])
+        self.assertEqual(self.suggest("fabuleux"), ["Amélie"])
+
+    def test_only_the_autocomplete_rate_applies(self):
+        # More requests than the 5/minute anonymous rate allows.
+        for _ in range(10):
+            self.suggest("mat")
+
+        with override_settings(
+            REST_FRAMEWORK={
+                **settings.REST_FRAMEWORK,
+                "DEFAULT_THROTTLE_RATES": {"autocomplete": "2/minute"},
+            }
+        ):
+            cache.clear()
+            statuses = [
+                self.client.get(self.url, {"q": "mat"}).status_code for _ in "abc"
+            ]
+        self.assertEqual(statuses, [200, 200, 429])
+
+
+class TokenBucketThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = "/movie_list/"
+        self.user = CustomUser.objects.create_user(
+            email="test@example.com", username="testuser", password="pass12345"
+        )
+
+    def statuses(self, count):
+        return [self.client.get(self.url).status_code for _ in range(count)]
+
+    def test_anonymous_requests_are_limited_per_client(self):
+        self.assertEqual(self.statuses(6), [200] * 5 + [429])
+        response = self.client.get(self.url)
+        self.assertEqual(response["Retry-After"], "12")
+
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.statuses(11), [200] * 10 + [429])
+
+    def test_buckets_refill_over_time(self):
+        self.statuses(5)
+        self.assertEqual(self.statuses(1), [429])
+
+        # Rewind the bucket's clock by half of the 5/minute period.
+        conn = get_redis_connection("default")
+        key = THROTTLE_KEY.format(scope="anon", ident="anon:127.0.0.1")
+        conn.hincrby(key, "ts", -30_000)
+        self.assertEqual(self.statuses(3), [200, 200, 429])
+
+    @override_settings(
+        REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK,
+            "DEFAULT_THROTTLE_RATES": {"user": "3/minute", "movie": "2/minute"},
+        }
+    )
+    def test_scopes_are_charged_together(self):
+        request = mock.Mock(user=self.user)
+        scoped = mock.Mock(throttle_scope="movie")
+        plain = mock.Mock(throttle_scope=None)
+
+        allowed = [TokenBucketThrottle().allow_request(request, scoped) for _ in "abc"]
+        self.assertEqual(allowed, [True, True, False])
+        # The rejected request took nothing from the user bucket.
+        self.assertTrue(TokenBucketThrottle().allow_request(request, plain))
+        self.assertFalse(TokenBucketThrottle().allow_request(request, plain))
+
+
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = "/recommendations/"
+        self.user = CustomUser.objects.create_user(
+            email="test@example.com", username="testuser", password="pass12345"
+        )
+        response = self.client.post(
+            "/login/", {"username": "test@example.com", "password": "pass12345"}
+        )
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {response.data['access_token']}"
+        )
+
+    def user_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return [q for q in ctx.captured_queries if "movies_customuser" in q["sql"]]
+
+    def test_user_is_looked_up_once(self):
+        self.assertEqual(len(self.user_queries()), 1)
+        self.assertEqual(self.user_queries(), [])
+
+    def test_deactivation_drops_cached_user(self):
+        self.user_queries()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_password_change_revokes_tokens(self):
+        self.user_queries()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password("changed123")
+            self.user.save()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data["code"], "token_revoked")
+
+    def test_hash_upgrade_at_login_keeps_tokens_valid(self):
+        self.assertTrue(self.user.password.startswith("md5$"))
+        version = self.user.token_version
+
+        # Logging in re-hashes the MD5 password with the new preferred hasher.
+        with self.settings(
+            PASSWORD_HASHERS=[
+                "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+                "django.contrib.auth.hashers.MD5PasswordHasher",
+            ]
+        ):
+            response = self.client.post(
+                "/login/", {"username": "test@example.com", "password": "pass12345"}
+            )
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
+        self.assertEqual(self.user.token_version, version)
+
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {response.data['access_token']}"
+        )
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+
+@override_settings(DATABASE_REPLICAS=["replica"], REPLICA_LAG_CHECK_INTERVAL=0)
+class ReplicaRoutingTests(TestCase):
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        create_movie(title="On primary")
+        Category.objects.create(category_name="Primary")
+        Movie.objects.using("replica").create(
+            title="On replica",
+            original_title="On replica",
+            overview="Overview",
+            release_date=datetime.date(2020, 1, 1),
+        )
+        Category.objects.using("replica").create(category_name="Replica")
+
+    def test_list_views_read_from_replica(self):
+        categories = self.client.get("/category_list/").data["detail"]
+        self.assertEqual([c["category_name"] for c in categories], ["Replica"])
+
+    def test_cached_pages_are_filled_from_primary(self):
+        movies = self.client.get("/movie_list/").data["results"]
+        self.assertEqual([movie["title"] for movie in movies], ["On primary"])
+
+        movie_ids = list(Movie.objects.values_list("id", flat=True))
+        with replica_reads():
+            payloads = hydrate_movie_payloads(movie_ids)
+        self.assertEqual([p["title"] for p in payloads.values()], ["On primary"])
+
+    def test_writes_pin_reads_to_primary(self):
+        with replica_reads():
+            self.assertEqual(Category.objects.get().category_name, "Replica")
+            Category.objects.create(category_name="Written")
+            self.assertEqual(Category.objects.count(), 2)
+        self.assertEqual(Category.objects.using("replica").count(), 1)
+
+    def test_other_views_use_primary(self):
+        response = self.client.get("/movie_search/", {"q": "primary"})
+        self.assertEqual(response.data["results"][0]["title"], "On primary")
+
+    def test_user_scores_are_loaded_from_primary(self):
+        user = CustomUser.objects.create_user(
+            email="test@example.com", username="testuser", password="pass12345"
+        )
+        movie = Movie.objects.get()
+        Rating.objects.create(user=user, movie=movie, score=7)
+
+        with replica_reads():
+            self.assertEqual(get_user_scores(user.id, [movie.id]), {movie.id: 7})
+
+    @override_settings(REPLICA_MAX_LAG=-1)
+    def test_lagging_replica_falls_back_to_primary(self):
+        categories = self.client.get("/category_list/").data["detail"]
+        self.assertEqual([c["category_name"] for c in categories], ["Primary"])
+
+
+@mock.patch("movies.views.aget_cached_movie_page", return_value=None)
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = "/movie_list/"
+        self.user = CustomUser.objects.create_user(
+            email="test@example.com", username="testuser", password="pass12345"
+        )
+        for i in range(15):
+            create_movie(title=f"Movie {i}", popularity=(i // 2) / 10)
+        call_command("rebuild_leaderboard", stdout=StringIO())
+
+    def titles(self, page=1):
+        response = self.client.get(self.url, {"page": page})
+        self.assertEqual(response.status_code, 200)
+        return [movie["title"] for movie in response.data["results"]]
+
+    def database_titles(self, page=1):
+        movies = Movie.objects.order_by("-popularity", "-id")
+        start, end = (page - 1) * 10, page * 10
+        return [movie.title for movie in movies[start:end]]
+
+    def test_top_pages_skip_postgres_once_hydrated(self, _):
+        self.assertEqual(self.titles(), self.database_titles())
+        self.assertEqual(self.titles(2), self.database_titles(2))
+
+        with self.assertNumQueries(0):
+            self.titles()
+            self.titles(2)
+
+    @override_settings(LEADERBOARD_PAGES=1)
+    def test_deep_pages_fall_back_to_postgres(self, _):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.titles(2), self.database_titles(2))
+        self.assertTrue(ctx.captured_queries)
+
+    def test_ratings_move_movies_in_leaderboard(self, _):
+        movie = Movie.objects.get(title="Movie 0")
+        disliked = Movie.objects.get(title="Movie 14")
+        self.titles()
+        self.client.force_authenticate(self.user)
+        for rated, score in ((movie, 10), (disliked, 2)):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post("/movie_rate/", {"movie": rated.id, "score": score})
+        self.client.force_authenticate(None)
+        with self.captureOnCommitCallbacks(execute=True):
+            update_weighted_ratings.delay()
+
+        top = self.client.get(self.url).data["results"][0]
+        self.assertEqual(self.titles(), self.database_titles())
+        self.assertEqual((top["title"], top["vote_count"]), ("Movie 0", 1))
+
+
+class TrendingMoviesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = "/trending/"
+        self.user = CustomUser.objects.create_user(
+            email="test@example.com", username="testuser", password="pass12345"
+        )
+        self.classic = create_movie(title="Classic", popularity=9)
+        self.new = create_movie(title="New", popularity=1)
+        self.now = 1_000_000 * 3600
+
+    def titles(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return [movie["title"] for movie in response.data["results"]]
+
+    def test_recent_votes_outweigh_older_ones(self):
+        for _ in range(3):
+            trending._record_vote(self.classic.id, now=self.now - 48 * 3600)
+        trending._record_vote(self.new.id, now=self.now)
+
+        self.assertEqual(trending.update_trending(now=self.now), 2)
+
+        self.assertEqual(self.titles(), ["New", "Classic"])
+
+    def test_votes_outside_window_are_ignored(self):
+        trending._record_vote(self.classic.id, now=self.now - 200 * 3600)
+        trending.update_trending(now=self.now)
+
+        self.assertEqual(self.titles(), [])
+
+    def test_rating_records_vote_and_timestamps(self):
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/movie_rate/", {"movie": self.new.id, "score": 8})
+        rating = Rating.objects.get()
+        created_at = rating.created_at
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/movie_rate/", {"movie": self.new.id, "score": 6})
+        rating.refresh_from_db()
+        self.assertEqual(rating.created_at, created_at)
+        self.assertGreater(rating.updated_at, created_at)
+
+        update_trending.delay()
+        response = self.client.get(self.url)
+        self.assertEqual(
+            [movie["title"] for movie in response.data["results"]], ["New"]
+        )
+        self.assertEqual(response.data["results"][0]["rating"], 6)
+
+
+class MovieScoreHistogramTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.users = [
+            CustomUser.objects.create_user(
+                email=f"user{i}@example.com", username=f"user{i}", password="pass"
+            )
+            for i in range(2)
+        ]
+        self.movie = create_movie()
+        self.url = f"/movie_histogram/{self.movie.id}/"
+
+    def rate(self, user, score=None):
+        self.client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            if score is None:
+                self.client.delete("/movie_rate/", {"movie": self.movie.id})
+            else:
+                self.client.post(
+                    "/movie_rate/", {"movie": self.movie.id, "score": score}
+                )
+
+    def histogram(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        detail = response.data["detail"]
+        return detail["vote_count"], {
+            int(score): votes for score, votes in detail["histogram"].items() if votes
+        }
+
+    def test_votes_move_between_buckets(self):
+        self.assertEqual(self.histogram(), (0, {}))
+
+        self.rate(self.users[0], 8)
+        self.rate(self.users[1], 8)
+        self.assertEqual(self.histogram(), (2, {8: 2}))
+
+        self.rate(self.users[0], 3)
+        self.rate(self.users[1])
+        self.assertEqual(self.histogram(), (1, {3: 1}))
+
+        with self.assertNumQueries(0):
+            self.histogram()
+
+    @override_settings(RATING_WRITE_BEHIND=True)
+    def test_write_behind_flush_updates_histogram(self):
+        self.rate(self.users[0], 9)
+        self.rate(self.users[0], 6)
+        self.rate(self.users[1], 6)
+        flush_rating_buffer.delay()
+
+        self.assertEqual(self.histogram(), (2, {6: 2}))
+
+    def test_rebuild_command(self):
+        for user, score in zip(self.users, (10, 2)):
+            Rating.objects.create(user=user, movie=self.movie, score=score)
+        self.assertEqual(self.histogram(), (0, {}))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("rebuild_score_histograms", stdout=StringIO())
+
+        self.assertEqual(self.histogram(), (2, {2: 1, 10: 1}))
+
+    def test_unknown_movie(self):
+        response = self.client.get("/movie_histogram/0/")
+        self.assertEqual(response.status_code, 404)
+
+
+class SimilarMoviesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.movies = [create_movie(title=f"Movie {i}") for i in range(4)]
+        # Users rate movies 0 and 1 alike and movie 2 differently.
+        scores = {
+            0: {0: 9, 1: 8, 2: 1},
+            1: {0: 8, 1: 9},
+            2: {0: 2, 1: 3, 2: 10},
+        }
+        for user_index, movie_scores in scores.items():
+            user = CustomUser.objects.create_user(
+                email=f"user{user_index}@example.com",
+                username=f"user{user_index}",
+                password="pass",
+            )
+            for movie_index, score in movie_scores.items():
+                Rating.objects.create(
+                    user=user, movie=self.movies[movie_index], score=score
+                )
+
+    def similar(self, movie):
+        response = self.client.get(f"/similar/{movie.id}/")
+        self.assertEqual(response.status_code, 200)
+        return [
+            (item["title"], item["similarity"]) for item in response.data["results"]
+        ]
+
+    def test_neighbors_are_ranked_by_cosine_similarity(self):
+        stats = compute_similar_movies.delay().get()
+        self.assertEqual((stats["ratings"], stats["movies"]), (8, 3))
+
+        neighbors = self.similar(self.movies[0])
+        self.assertEqual([title for title, _ in neighbors], ["Movie 1", "Movie 2"])
+        self.assertGreater(neighbors[0][1], neighbors[1][1])
+        self.assertEqual(self.similar(self.movies[3]), [])
+
+    def test_unknown_movie(self):
+        response = self.client.get("/similar/0/")
+        self.assertEqual(response.status_code, 404)
+
+
+class RecommendedMoviesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = "/recommendations/"
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.settings_override = override_settings(
+            RECOMMENDER_DIR=self.tmp.name,
+            RECOMMENDER_FACTORS=2,
+            RECOMMENDER_ITERATIONS=15,
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        self.action = [create_movie(title=f"Action {i}") for i in range(3)]
+        self.drama = [create_movie(title=f"Drama {i}") for i in range(3)]
+        for i in range(8):
+            liked, disliked = (
+                (self.action, self.drama) if i % 2 else (self.drama, self.action)
+            )
+            user = self.create_user(f"fan{i}")
+            # Every fan leaves one movie of each kind unrated.
+            for position, movie in enumerate(liked):
+                if position != i % 3:
+                    Rating.objects.create(user=user, movie=movie, score=9)
+            for position, movie in enumerate(disliked):
+                if position != i % 3:
+                    Rating.objects.create(user=user, movie=movie, score=2)
+
+    def create_user(self, name):
+        return CustomUser.objects.create_user(
+            email=f"{name}@example.com", username=name, password="pass"
+        )
+
+    def recommended(self, user):
+        self.client.force_authenticate(user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        titles = [movie["title"] for movie in response.data["results"]]
+        return response.data["personalized"], titles
+
+    def test_trained_users_get_their_unrated_favourites_first(self):
+        stats = train_recommender.delay().get()
+        self.assertEqual((stats["users"], stats["movies"]), (8, 6))
+
+        action_fan = CustomUser.objects.get(username="fan1")
+        personalized, titles = self.recommended(action_fan)
+        self.assertTrue(personalized)
+        self.assertEqual(titles, ["Action 1", "Drama 1"])
+
+    def test_new_users_are_folded_in_on_their_next_rating(self):
+        train_recommender.delay()
+        user = self.create_user("newcomer")
+        self.assertEqual(self.recommended(user)[0], False)
+
+        for movie, score in (
+            (self.drama[0], 10),
+            (self.drama[1], 9),
+            (self.action[0], 1),
+        ):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post("/movie_rate/", {"movie": movie.id, "score": score})
+
+        personalized, titles = self.recommended(user)
+        self.assertTrue(personalized)
+        self.assertEqual(titles[0], "Drama 2")
+        self.assertEqual(set(titles), {"Drama 2", "Action 1", "Action 2"})
+
+    def test_popular_movies_without_a_model(self):
+        personalized, titles = self.recommended(self.create_user("visitor"))
+
+        self.assertFalse(personalized)
+        self.assertEqual(len(titles), 6)
@@ -1,5 +1,136 @@
-from rest_framework.throttling import ScopedRateThrottle
+import math
 
+from django_redis import get_redis_connection
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
 
-class CustomMovieThrottle(ScopedRateThrottle):
-    scope = "movie"
+THROTTLE_KEY = "throttle:{scope}:{ident}"
+DURATIONS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# KEYS are bucket hashes; ARGV holds a (capacity, tokens per second) pair per
+# key. Every bucket is refilled to the Redis clock and the request takes one
+# token from each only if all of them have one, so concurrent requests cannot
+# overspend a bucket between a read and a write. Returns 1 when allowed, or 0
+# and the milliseconds until the emptiest bucket has a token again.
+TOKEN_BUCKET_SCRIPT = """
+local time = redis.call("TIME")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local tokens = {}
+local wait = 0
+
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2 - 1])
+    local rate = tonumber(ARGV[i * 2]) / 1000
+    local state = redis.call("HMGET", key, "tokens", "ts")
+    local available = tonumber(state[1]) or capacity
+    local elapsed = math.max(0, now - (tonumber(state[2]) or now))
+    available = math.min(capacity, available + elapsed * rate)
+    tokens[i] = available
+    if available < 1 then
+        wait = math.max(wait, math.ceil((1 - available) / rate))
+    end
+end
+
+local allowed = wait == 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2 - 1])
+    local rate = tonumber(ARGV[i * 2]) / 1000
+    local available = tokens[i]
+    if allowed then
+        available = available - 1
+    end
+    redis.call("HSET", key, "tokens", tostring(available), "ts", now)
+    redis.call("PEXPIRE", key, math.ceil(capacity / rate))
+end
+
+if allowed then
+    return {1, 0}
+end
+return {0, wait}
+"""
+
+
+def parse_rate(rate):
+    """``"10/minute"`` -> ``(10, 60)``, in the format DRF's throttles accept."""
+    num, period = rate.split("/")
+    return int(num), DURATIONS[period[0]]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Throttle every applicable scope with one atomic Redis script call.
+
+    Authenticated requests are limited by the "user" rate per user, anonymous
+    ones by the "anon" rate per client address, and views that set
+    ``throttle_scope`` additionally by that scope's rate. Each scope is a
+    token bucket holding up to the rate's request count and refilling evenly
+    over its period, so idle clients regain their allowance gradually
+    instead of all at once.
+    """
+
+    rates = None
+    script = None
+
+    def __init__(self):
+        if self.rates is None:
+            self.rates = api_settings.DEFAULT_THROTTLE_RATES
+        self.wait_seconds = None
+
+    def get_scopes(self, request, view):
+        """Return the client's identity and the scopes to charge it under."""
+        if request.user and request.user.is_authenticated:
+            ident = f"user:{request.user.pk}"
+            scopes = ["user"]
+        else:
+            ident = f"anon:{self.get_ident(request)}"
+            scopes = ["anon"]
+        view_scope = getattr(view, "throttle_scope", None)
+        if view_scope:
+            scopes.append(view_scope)
+        return ident, scopes
+
+    def get_buckets(self, request, view):
+        ident, scopes = self.get_scopes(request, view)
+        buckets = []
+        for scope in scopes:
+            rate = self.rates.get(scope)
+            if rate is None:
+                continue
+            capacity, duration = parse_rate(rate)
+            key = THROTTLE_KEY.format(scope=scope, ident=ident)
+            buckets.append((key, capacity, capacity / duration))
+        return buckets
+
+    def allow_request(self, request, view):
+        buckets = self.get_buckets(request, view)
+        if not buckets:
+            return True
+
+        keys = [key for key, _, _ in buckets]
+        args = [value for _, capacity, rate in buckets for value in (capacity, rate)]
+        allowed, wait_ms = self.get_script()(keys=keys, args=args)
+        self.wait_seconds = wait_ms / 1000
+        return bool(allowed)
+
+    def wait(self):
+        return math.ceil(self.wait_seconds) if self.wait_seconds else None
+
+    @classmethod
+    def get_script(cls):
+        if cls.script is None:
+            cls.script = get_redis_connection("default").register_script(
+                TOKEN_BUCKET_SCRIPT
+            )
+        return cls.script
+
+
+class ScopedTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Charge only the view's ``throttle_scope``, per user or client address,
+    for views called too often for the shared "user" and "anon" rates, such
+    as one request per keystroke.
+    """
+
+    def get_scopes(self, request, view):
+        ident, scopes = super().get_scopes(request, view)
+        return ident, scopes[1:]
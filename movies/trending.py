@@ -0,0 +1,82 @@
+import math
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django_redis import get_redis_connection
+
+from .leaderboard import member
+
+BUCKET_KEY = "trending:votes:{hour}"
+TRENDING_KEY = "trending:scores"
+
+
+def current_hour(now=None):
+    return int((now if now is not None else time.time()) // 3600)
+
+
+def record_vote(movie_id):
+    """Count a vote for ``movie_id`` in this hour's bucket after commit."""
+    transaction.on_commit(lambda: _record_vote(movie_id))
+
+
+def _record_vote(movie_id, now=None):
+    key = BUCKET_KEY.format(hour=current_hour(now))
+    pipe = get_redis_connection("default").pipeline()
+    pipe.hincrby(key, movie_id, 1)
+    pipe.expire(key, (settings.TRENDING_WINDOW_HOURS + 1) * 3600)
+    pipe.execute()
+
+
+def trending_scores(buckets, hour):
+    """
+    Sum ``{hour: {movie_id: votes}}`` buckets, halving a vote's weight every
+    ``TRENDING_HALF_LIFE_HOURS``.
+    """
+    decay = math.log(2) / settings.TRENDING_HALF_LIFE_HOURS
+    scores = {}
+    for bucket_hour, votes in buckets.items():
+        weight = math.exp(-decay * (hour - bucket_hour))
+        for movie_id, count in votes.items():
+            scores[movie_id] = scores.get(movie_id, 0) + int(count) * weight
+    return scores
+
+
+def update_trending(now=None):
+    """
+    Score every movie voted on within ``TRENDING_WINDOW_HOURS`` and swap the
+    top ``TRENDING_SIZE`` into the sorted set read by ``trending/``.
+    """
+    conn = get_redis_connection("default")
+    hour = current_hour(now)
+    hours = range(hour - settings.TRENDING_WINDOW_HOURS + 1, hour + 1)
+
+    pipe = conn.pipeline(transaction=False)
+    for bucket_hour in hours:
+        pipe.hgetall(BUCKET_KEY.format(hour=bucket_hour))
+    buckets = {
+        bucket_hour: {int(movie_id): count for movie_id, count in votes.items()}
+        for bucket_hour, votes in zip(hours, pipe.execute())
+        if votes
+    }
+
+    scores = trending_scores(buckets, hour)
+    top = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    top = top[: settings.TRENDING_SIZE]
+
+    building_key = f"{TRENDING_KEY}:building"
+    pipe = conn.pipeline()
+    if top:
+        pipe.delete(building_key)
+        pipe.zadd(building_key, {member(movie_id): score for movie_id, score in top})
+        pipe.rename(building_key, TRENDING_KEY)
+    else:
+        pipe.delete(TRENDING_KEY)
+    pipe.execute()
+    return len(top)
+
+
+def get_trending_ids(start, stop):
+    """Movie ids ranked ``start`` to ``stop`` (inclusive) by trending score."""
+    members = get_redis_connection("default").zrevrange(TRENDING_KEY, start, stop)
+    return [int(value) for value in members]
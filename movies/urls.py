@@ -4,11 +4,20 @@ from .views import (
     AddCategory,
     AddCategoryCover,
     AddMovie,
+    AutocompleteMovies,
     CategoryList,
+    CategoryUploadStatus,
     GetMovies,
+    ImportCatalog,
     LoginView,
+    MovieScoreHistogram,
+    MovieUploadStatus,
     RateMovie,
+    RecommendedMovies,
     RegisterView,
+    SearchMovies,
+    SimilarMovies,
+    TrendingMovies,
     movie_list,
 )
 
@@ -17,9 +26,38 @@ urlpatterns = [
     path("login/", LoginView.as_view(), name="login"),
     path("movie_add/", AddMovie.as_view(), name="add-movie"),
     path("movie_list/", GetMovies.as_view(), name="movie-list"),
+    path("movie_import/", ImportCatalog.as_view(), name="movie-import"),
+    path("movie_search/", SearchMovies.as_view(), name="movie-search"),
+    path(
+        "movie_autocomplete/",
+        AutocompleteMovies.as_view(),
+        name="movie-autocomplete",
+    ),
+    path("trending/", TrendingMovies.as_view(), name="movie-trending"),
+    path("similar/<int:movie_id>/", SimilarMovies.as_view(), name="movie-similar"),
+    path(
+        "recommendations/",
+        RecommendedMovies.as_view(),
+        name="movie-recommendations",
+    ),
     path("category_create/", AddCategory.as_view(), name="category-create"),
     path("category_list/", CategoryList.as_view(), name="category-list"),
     path("category_cover/", AddCategoryCover.as_view(), name="category-cover"),
     path("movie_rate/", RateMovie.as_view(), name="movie-rate"),
+    path(
+        "movie_upload_status/<int:movie_id>/",
+        MovieUploadStatus.as_view(),
+        name="movie-upload-status",
+    ),
+    path(
+        "movie_histogram/<int:movie_id>/",
+        MovieScoreHistogram.as_view(),
+        name="movie-histogram",
+    ),
+    path(
+        "category_upload_status/<int:category_id>/",
+        CategoryUploadStatus.as_view(),
+        name="category-upload-status",
+    ),
     path("", movie_list, name="movie-list"),
 ]
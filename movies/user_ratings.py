@@ -0,0 +1,100 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django_redis import get_redis_connection
+
+from .models import Rating
+
+USER_RATINGS_KEY = "user_ratings:{user_id}"
+# Marks a hash that holds every rating of the user, not just recent writes.
+LOADED_FIELD = "loaded"
+
+
+def get_user_scores(user_id, movie_ids):
+    """Return ``{movie_id: score}`` of the user for the given movies."""
+    if not movie_ids:
+        return {}
+
+    conn = get_redis_connection("default")
+    key = USER_RATINGS_KEY.format(user_id=user_id)
+
+    values = conn.hmget(key, [LOADED_FIELD, *movie_ids])
+    if values[0] is None:
+        load_user_scores(user_id)
+        values = conn.hmget(key, [LOADED_FIELD, *movie_ids])
+
+    return {
+        movie_id: int(score)
+        for movie_id, score in zip(movie_ids, values[1:])
+        if score is not None
+    }
+
+
+def get_all_user_scores(user_id):
+    """Return every ``{movie_id: score}`` of the user."""
+    conn = get_redis_connection("default")
+    key = USER_RATINGS_KEY.format(user_id=user_id)
+
+    values = conn.hgetall(key)
+    if LOADED_FIELD.encode() not in values:
+        load_user_scores(user_id)
+        values = conn.hgetall(key)
+
+    return {
+        int(movie_id): int(score)
+        for movie_id, score in values.items()
+        if movie_id != LOADED_FIELD.encode()
+    }
+
+
+def load_user_scores(user_id):
+    conn = get_redis_connection("default")
+    key = USER_RATINGS_KEY.format(user_id=user_id)
+    # Always the primary: a lagging replica would cache deleted or old scores
+    # for the lifetime of the hash.
+    scores = dict(
+        Rating.objects.using(DEFAULT_DB_ALIAS)
+        .filter(user_id=user_id)
+        .values_list("movie_id", "score")
+    )
+
+    pipe = conn.pipeline()
+    pipe.hset(key, mapping={LOADED_FIELD: 1, **scores})
+    pipe.expire(key, settings.USER_RATINGS_CACHE_TIMEOUT)
+    pipe.execute()
+
+
+def set_user_score(user_id, movie_id, score):
+    """Record a new score once the current transaction commits."""
+
+    def _set():
+        key = USER_RATINGS_KEY.format(user_id=user_id)
+        pipe = get_redis_connection("default").pipeline()
+        pipe.hset(key, movie_id, score)
+        # A user rating before the hash is loaded must not leave it behind
+        # forever.
+        pipe.expire(key, settings.USER_RATINGS_CACHE_TIMEOUT)
+        pipe.execute()
+
+    transaction.on_commit(_set)
+
+
+def remove_user_score(user_id, movie_id):
+    """Forget a removed score once the current transaction commits."""
+
+    def _remove():
+        conn = get_redis_connection("default")
+        conn.hdel(USER_RATINGS_KEY.format(user_id=user_id), movie_id)
+
+    transaction.on_commit(_remove)
+
+
+def overlay_user_scores(response_data, user_id):
+    """Copy a shared movie page with the user's own scores filled in."""
+    results = response_data["results"]
+    scores = get_user_scores(user_id, [movie["id"] for movie in results])
+    return {
+        **response_data,
+        "results": [
+            {**movie, "rating": scores.get(movie["id"], 0)} for movie in results
+        ],
+    }
@@ -1,31 +1,139 @@
 import base64
-import imghdr
+import binascii
 import logging
+import os
+import uuid
 
-from cloudinary.uploader import upload
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.utils.module_loading import import_string
 
 logger = logging.getLogger(__name__)
 
+# Decoded 48 KiB at a time; must stay a multiple of 4 base64 characters.
+BASE64_CHUNK_SIZE = 64 * 1024
+COPY_CHUNK_SIZE = 64 * 1024
+UPLOAD_CHUNK_SIZE = 6 * 1024 * 1024
+HEADER_SIZE = 16
 
-def decode_and_upload_to_cloudinary(base64_str, folder_name, file_name):
+
+def detect_image_format(header):
+    """Return the file extension for an image header, or None if unsupported."""
+    if header.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if header[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def read_image_format(path):
+    with open(path, "rb") as f:
+        return detect_image_format(f.read(HEADER_SIZE))
+
+
+def new_upload_path():
+    os.makedirs(settings.IMAGE_UPLOAD_DIR, exist_ok=True)
+    return os.path.join(settings.IMAGE_UPLOAD_DIR, uuid.uuid4().hex)
+
+
+def stage_uploaded_file(uploaded_file):
+    """
+    Move a multipart upload into ``IMAGE_UPLOAD_DIR`` for the Celery workers.
+
+    Uploads spooled to disk are renamed in place; anything else is copied in
+    fixed-size chunks.
+    """
+    path = new_upload_path()
+    if hasattr(uploaded_file, "temporary_file_path"):
+        file_move_safe(uploaded_file.temporary_file_path(), path)
+    else:
+        with open(path, "wb") as f:
+            for chunk in uploaded_file.chunks(COPY_CHUNK_SIZE):
+                f.write(chunk)
+    return path
+
+
+def stage_uploaded_image(uploaded_file):
+    path = stage_uploaded_file(uploaded_file)
+    _check_image(path)
+    return path
+
+
+def stage_base64_image(base64_str):
+    """Decode a base64 image into ``IMAGE_UPLOAD_DIR`` one chunk at a time."""
+    start = 0
+    if base64_str.startswith("data:image"):
+        start = base64_str.find("base64,")
+        if start == -1:
+            raise ValueError("Invalid base64 content.")
+        start += len("base64,")
+
+    path = new_upload_path()
     try:
-        format_map = {"jpeg": "jpg", "png": "png", "gif": "gif", "webp": "webp"}
+        with open(path, "wb") as f:
+            for chunk in _base64_chunks(base64_str, start):
+                f.write(base64.b64decode(chunk, validate=True))
+    except binascii.Error as e:
+        logger.error(f"Base64 decode error: {e}")
+        os.remove(path)
+        raise ValueError("Invalid base64 content.")
+    _check_image(path)
+    return path
 
-        decoded_file = base64.b64decode(base64_str)
 
-        file_format = imghdr.what(None, decoded_file)
-        file_extension = format_map.get(file_format, "jpg")
+def _base64_chunks(base64_str, start):
+    """
+    Yield ``base64_str[start:]`` without whitespace in pieces that decode on
+    their own: every piece but the (padded) last is a multiple of 4 long.
+    """
+    carry = ""
+    for offset in range(start, len(base64_str), BASE64_CHUNK_SIZE):
+        end = offset + BASE64_CHUNK_SIZE
+        chunk = carry + "".join(base64_str[offset:end].split())
+        cut = len(chunk) - len(chunk) % 4
+        carry = chunk[cut:]
+        yield chunk[:cut]
+    if carry:
+        yield carry + "=" * (4 - len(carry))
 
-        full_file_name = f"{file_name}.{file_extension}"
-        image = ContentFile(decoded_file, name=full_file_name)
 
-        upload_result = upload(
-            image, folder=folder_name, public_id=file_name, overwrite=True
-        )
+def discard_staged_image(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _check_image(path):
+    if read_image_format(path) is None:
+        discard_staged_image(path)
+        raise ValueError("Unsupported image format.")
+
 
+def upload_image_to_cloudinary(path, folder_name, file_name):
+    """Upload a staged image file to Cloudinary in fixed-size chunks."""
+    # Imported here so only processes that upload load the SDK's uploader.
+    from cloudinary.uploader import upload_large
+
+    try:
+        upload_result = upload_large(
+            path,
+            folder=folder_name,
+            public_id=file_name,
+            overwrite=True,
+            chunk_size=UPLOAD_CHUNK_SIZE,
+        )
         return upload_result["secure_url"]
 
     except Exception as e:
         logger.error(f"Cloudinary upload failed: {e}")
         raise ValueError("Failed to upload image to Cloudinary.")
+
+
+def get_image_uploader():
+    """Return the ``IMAGE_UPLOADER`` callable (Cloudinary unless overridden)."""
+    return import_string(settings.IMAGE_UPLOADER)
@@ -1,28 +1,79 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
 from django.core.paginator import Paginator
 from django.db import transaction
+from django.db.models import F
+from django.http import Http404
 from django.shortcuts import get_object_or_404, render
 from rest_framework import generics, status
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 
-from .models import Category, CustomUser, Movie, Rating
+from .async_views import AsyncAPIView
+from .authentication import UserRefreshToken
+from .autocomplete import index_movies, suggest
+from .caching import (
+    aget_cached_histogram,
+    aget_cached_movie_page,
+    amovie_page_cache_key,
+    aset_cached_histogram,
+    aset_cached_movie_page,
+    bump_catalog_version,
+)
+from .filters import facet_counts, filter_movies, has_filters
+from .importer import detect_format
+from .leaderboard import get_page as get_leaderboard_page
+from .leaderboard import get_payloads, record_popularity
+from .models import (
+    SCORES,
+    Category,
+    CustomUser,
+    Movie,
+    MovieNeighbor,
+    Rating,
+    ScoreHistogram,
+    UploadStatus,
+)
+from .pagination import InvalidCursor, KeysetPaginator
+from .rating_buffer import record_rating_change
+from .recommendations import recommend
+from .routers import primary_reads, read_from_replica
 from .serializers import (
     CategorySerializer,
     CreateCategoryCoverSerializer,
     CreateCategorySerializer,
     LoginSerializer,
     MovieCreateSerializer,
+    MovieFilterSerializer,
     MovieListSerializer,
     RatingSerializer,
     RegisterSerializer,
 )
-from .utils import decode_and_upload_to_cloudinary
+from .tasks import fold_in_user, import_catalog, upload_category_cover
+from .throttles import ScopedTokenBucketThrottle
+from .trending import get_trending_ids
+from .user_ratings import (
+    get_all_user_scores,
+    overlay_user_scores,
+    remove_user_score,
+)
+from .utils import discard_staged_image, stage_uploaded_file
 
 
+@read_from_replica
 def movie_list(request):
-    movies = Movie.objects.all().order_by("-popularity")
+    cursor = request.GET.get("cursor")
+    if cursor is not None:
+        paginator = KeysetPaginator(Movie.objects.all(), per_page=8)
+        try:
+            page_obj = paginator.get_page(cursor)
+        except InvalidCursor:
+            page_obj = paginator.get_page()
+        return render(request, "movies.html", {"movies": page_obj})
+
+    movies = Movie.objects.all().order_by("-popularity", "-id")
     paginator = Paginator(movies, 8)
 
     page_number = request.GET.get("page")
@@ -31,6 +82,21 @@ def movie_list(request):
     return render(request, "movies.html", {"movies": page_obj})
 
 
+def hydrate_movie_payloads(movie_ids):
+    """
+    Shared (``rating`` 0) list payloads of ``movie_ids``, keyed by id. They are
+    cached, so they are read from the primary.
+    """
+    with primary_reads():
+        rows = list(
+            Movie.objects.filter(pk__in=movie_ids).values(
+                *MovieListSerializer.VALUE_FIELDS
+            )
+        )
+        context = MovieListSerializer.build_context(None, rows, with_ratings=False)
+    return {item["id"]: item for item in MovieListSerializer.from_values(rows, context)}
+
+
 class RegisterView(generics.CreateAPIView):
     permission_classes = [AllowAny]
     queryset = CustomUser.objects.all()
@@ -61,7 +127,7 @@ class RegisterView(generics.CreateAPIView):
 
         with transaction.atomic():
             user = serializer.save()
-            refresh_token = RefreshToken.for_user(user)
+            refresh_token = UserRefreshToken.for_user(user)
 
             return Response(
                 {
@@ -88,7 +154,7 @@ class LoginView(generics.GenericAPIView):
             )
 
         user = serializer.validated_data["user"]
-        refresh_token = RefreshToken.for_user(user)
+        refresh_token = UserRefreshToken.for_user(user)
 
         return Response(
             {
@@ -105,9 +171,21 @@ class AddMovie(APIView):
     def post(self, request, *args, **kwargs):
         serializer = MovieCreateSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            movie = serializer.save()
+            bump_catalog_version()
+            record_popularity({movie.id: movie.popularity})
+            transaction.on_commit(
+                lambda: index_movies(
+                    [(movie.id, movie.title, movie.original_title, movie.popularity)]
+                )
+            )
             return Response(
-                {"success": True, "detail": "Movie added successfully."},
+                {
+                    "success": True,
+                    "detail": "Movie added successfully.",
+                    "movie_id": movie.id,
+                    "upload_status": movie.upload_status,
+                },
                 status=status.HTTP_201_CREATED,
             )
         return Response(
@@ -116,28 +194,290 @@ class AddMovie(APIView):
         )
 
 
-class GetMovies(APIView):
-    def get(self, request, *args, **kwargs):
-        movies = Movie.objects.all().order_by("-popularity")
+class ImportCatalog(APIView):
+    permission_classes = [IsAdminUser]
 
+    def post(self, request, *args, **kwargs):
+        catalog = request.FILES.get("file")
+        fmt = request.data.get("format") or (catalog and detect_format(catalog.name))
+
+        if not catalog or fmt not in ("jsonl", "csv"):
+            return Response(
+                {"success": False, "detail": "A JSONL or CSV file is required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        path = stage_uploaded_file(catalog)
+        import_catalog.delay(path, fmt)
+        return Response(
+            {"success": True, "detail": "Catalog import started."},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class GetMovies(AsyncAPIView):
+    @read_from_replica
+    async def get(self, request, *args, **kwargs):
+        cursor = request.query_params.get("cursor")
         page_number = request.query_params.get("page", 1)
+
+        filter_serializer = MovieFilterSerializer(data=request.query_params)
+        if not filter_serializer.is_valid():
+            return Response(
+                {"success": False, "detail": filter_serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        filters = filter_serializer.validated_data
+
+        cache_key = await amovie_page_cache_key(
+            page=page_number, cursor=cursor, filters=filters
+        )
+        response_data = await aget_cached_movie_page(cache_key)
+
+        if response_data is None:
+            # Filled from the primary: a lagging replica would cache old rows
+            # under the current catalog version.
+            with primary_reads():
+                movies = filter_movies(Movie.objects.all(), filters)
+                if cursor is not None:
+                    try:
+                        response_data = await sync_to_async(self.get_cursor_page)(
+                            request, movies, cursor
+                        )
+                    except InvalidCursor as e:
+                        return Response(
+                            {"success": False, "detail": str(e)},
+                            status=status.HTTP_400_BAD_REQUEST,
+                        )
+                elif not has_filters(filters):
+                    response_data = await sync_to_async(self.get_leaderboard_page)(
+                        page_number
+                    ) or await self.get_numbered_page(request, movies, page_number)
+                else:
+                    response_data = await self.get_numbered_page(
+                        request, movies, page_number
+                    )
+                if filters["facets"]:
+                    response_data["facets"] = await sync_to_async(facet_counts)(movies)
+                await aset_cached_movie_page(cache_key, response_data)
+
+        if request.user.is_authenticated:
+            response_data = await sync_to_async(overlay_user_scores)(
+                response_data, request.user.id
+            )
+
+        return Response(response_data, status=status.HTTP_200_OK)
+
+    async def get_numbered_page(self, request, movies, page_number):
+        movies = movies.order_by("-popularity", "-id").values(
+            *MovieListSerializer.VALUE_FIELDS
+        )
+
         paginator = Paginator(movies, per_page=10)
+        # Count with the async ORM; the paginator only needs the total.
+        paginator.count = await movies.acount()
         page_obj = paginator.get_page(page_number)
+        rows = [row async for row in page_obj.object_list]
+
+        context = await sync_to_async(MovieListSerializer.build_context)(
+            request, rows, with_ratings=False
+        )
+        results = MovieListSerializer.from_values(rows, context)
+
+        return {"page": page_obj.number, "results": results}
+
+    def get_leaderboard_page(self, page_number):
+        """Serve a top page from the Redis leaderboard, or None to use Postgres."""
+        try:
+            page_number = int(page_number)
+        except (TypeError, ValueError):
+            return None
+
+        results = get_leaderboard_page(page_number, 10, hydrate_movie_payloads)
+        if results is None:
+            return None
+        return {"page": page_number, "results": results}
+
+    def get_cursor_page(self, request, movies, cursor):
+        paginator = KeysetPaginator(movies, per_page=10)
+        page_obj = paginator.get_page(cursor)
+        movies = page_obj.object_list
 
         serializer = MovieListSerializer(
-            page_obj, many=True, context={"request": request}
+            movies,
+            many=True,
+            context=MovieListSerializer.build_context(
+                request, movies, with_ratings=False
+            ),
         )
 
-        response_data = {"page": page_obj.number, "results": serializer.data}
+        return {
+            "next": page_obj.next_cursor,
+            "previous": page_obj.previous_cursor,
+            "results": serializer.data,
+        }
+
+
+class SearchMovies(APIView):
+    permission_classes = [AllowAny]
+    page_size = 10
+    max_page = 100
+
+    def get(self, request, *args, **kwargs):
+        terms = request.query_params.get("q", "").strip()
+        if not terms:
+            return Response(
+                {"success": False, "detail": "Search query is required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            page_number = int(request.query_params.get("page", 1))
+        except ValueError:
+            page_number = 1
+        page_number = min(max(page_number, 1), self.max_page)
+
+        query = SearchQuery(
+            terms, search_type="websearch", config=settings.SEARCH_CONFIG
+        )
+        start = (page_number - 1) * self.page_size
+        end = start + self.page_size + 1
+        rows = list(
+            Movie.objects.filter(search_vector=query)
+            .annotate(rank=SearchRank(F("search_vector"), query))
+            .order_by("-rank", "-popularity", "-id")
+            .values(*MovieListSerializer.VALUE_FIELDS)[start:end]
+        )
+        has_next = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+
+        context = MovieListSerializer.build_context(request, rows)
+        results = MovieListSerializer.from_values(rows, context)
+
+        return Response(
+            {"page": page_number, "has_next": has_next, "results": results},
+            status=status.HTTP_200_OK,
+        )
+
+
+class TrendingMovies(AsyncAPIView):
+    """Movies ranked by recent, exponentially decayed vote activity."""
+
+    permission_classes = [AllowAny]
+    page_size = 10
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            page_number = int(request.query_params.get("page", 1))
+        except ValueError:
+            page_number = 1
+        max_page = max(settings.TRENDING_SIZE // self.page_size, 1)
+        page_number = min(max(page_number, 1), max_page)
+
+        start = (page_number - 1) * self.page_size
+        movie_ids = await sync_to_async(get_trending_ids)(start, start + self.page_size)
+        has_next = len(movie_ids) > self.page_size
+        movie_ids = movie_ids[: self.page_size]
+
+        response_data = {
+            "page": page_number,
+            "has_next": has_next,
+            "results": await sync_to_async(get_payloads)(
+                movie_ids, hydrate_movie_payloads
+            ),
+        }
+        if request.user.is_authenticated:
+            response_data = await sync_to_async(overlay_user_scores)(
+                response_data, request.user.id
+            )
 
         return Response(response_data, status=status.HTTP_200_OK)
 
 
-class CategoryList(APIView):
+class SimilarMovies(APIView):
+    """Movies most often rated alike with ``movie_id``, from the nightly job."""
+
     permission_classes = [AllowAny]
 
+    def get(self, request, movie_id, *args, **kwargs):
+        neighbors = dict(
+            MovieNeighbor.objects.filter(movie_id=movie_id)
+            .order_by("-similarity")
+            .values_list("neighbor_id", "similarity")[: settings.SIMILAR_MOVIES_TOP_K]
+        )
+        if not neighbors:
+            get_object_or_404(Movie, id=movie_id)
+
+        results = [
+            {**movie, "similarity": round(neighbors[movie["id"]], 4)}
+            for movie in get_payloads(list(neighbors), hydrate_movie_payloads)
+        ]
+        response_data = {"movie_id": movie_id, "results": results}
+        if request.user.is_authenticated:
+            response_data = overlay_user_scores(response_data, request.user.id)
+
+        return Response(response_data, status=status.HTTP_200_OK)
+
+
+class RecommendedMovies(APIView):
+    """
+    Movies the caller has not rated, ranked by their factor dot product, or
+    by popularity until the caller has factors.
+    """
+
+    permission_classes = [IsAuthenticated]
+
     def get(self, request, *args, **kwargs):
-        categories = Category.objects.all()
+        rated = get_all_user_scores(request.user.id)
+        limit = settings.RECOMMENDATIONS_TOP_K
+
+        movie_ids = recommend(request.user.id, rated, limit)
+        personalized = movie_ids is not None
+        if not personalized:
+            movie_ids = list(
+                Movie.objects.exclude(pk__in=rated)
+                .order_by("-popularity", "-id")
+                .values_list("id", flat=True)[:limit]
+            )
+
+        return Response(
+            {
+                "personalized": personalized,
+                "results": get_payloads(movie_ids, hydrate_movie_payloads),
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class AutocompleteMovies(APIView):
+    """
+    Title suggestions served from the Redis prefix index. Throttled by the
+    generous "autocomplete" rate alone, which also bounds the database
+    queries made while the index is being built.
+    """
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    throttle_classes = [ScopedTokenBucketThrottle]
+    throttle_scope = "autocomplete"
+
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = int(request.query_params.get("limit", 10))
+        except ValueError:
+            limit = 10
+        limit = max(limit, 1)
+
+        results = suggest(request.query_params.get("q", ""), limit)
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+
+class CategoryList(AsyncAPIView):
+    permission_classes = [AllowAny]
+
+    @read_from_replica
+    async def get(self, request, *args, **kwargs):
+        categories = [category async for category in Category.objects.all()]
 
         serializer = CategorySerializer(categories, many=True)
 
@@ -160,6 +500,7 @@ class AddCategory(APIView):
         )
         if serializer.is_valid():
             category = serializer.save()
+            bump_catalog_version()
             return Response(
                 {
                     "success": True,
@@ -183,37 +524,30 @@ class AddCategoryCover(APIView):
         serializer = self.serializer_class(data=request.data)
         if serializer.is_valid():
             category_id = serializer.validated_data["category_id"]
-            cover_base64 = serializer.validated_data["cover_base64"]
-            try:
-                category = Category.objects.get(id=category_id)
-
-                file_name = f"category_{category.id}_{category.category_name}"
-
-                cover_url = decode_and_upload_to_cloudinary(
-                    base64_str=cover_base64,
-                    folder_name="category_covers",
-                    file_name=file_name,
-                )
+            cover_path = serializer.validated_data["cover_path"]
 
-                category.cover_url = cover_url
-                category.save()
-                return Response(
-                    {
-                        "success": True,
-                        "detail": "Category cover uploaded successfully.",
-                    },
-                    status=status.HTTP_200_OK,
-                )
-            except Category.DoesNotExist:
+            updated = Category.objects.filter(id=category_id).update(
+                upload_status=UploadStatus.PENDING,
+                pending_uploads=F("pending_uploads") + 1,
+            )
+            if not updated:
+                discard_staged_image(cover_path)
                 return Response(
                     {"success": False, "detail": "Category not found."},
                     status=status.HTTP_404_NOT_FOUND,
                 )
-            except ValueError as e:
-                return Response(
-                    {"success": False, "detail": str(e)},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+
+            transaction.on_commit(
+                lambda: upload_category_cover.delay(category_id, cover_path)
+            )
+            return Response(
+                {
+                    "success": True,
+                    "detail": "Category cover upload started.",
+                    "upload_status": UploadStatus.PENDING,
+                },
+                status=status.HTTP_202_ACCEPTED,
+            )
         else:
             return Response(
                 {"success": False, "detail": "Invalid data."},
@@ -221,6 +555,68 @@ class AddCategoryCover(APIView):
             )
 
 
+class MovieUploadStatus(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request, movie_id, *args, **kwargs):
+        movie = get_object_or_404(Movie, id=movie_id)
+        return Response(
+            {
+                "success": True,
+                "detail": {
+                    "upload_status": movie.upload_status,
+                    "poster_path": movie.poster_path,
+                    "backdrop_path": movie.backdrop_path,
+                },
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class MovieScoreHistogram(AsyncAPIView):
+    """Number of ratings per score (1-10) of a movie, without scanning Rating."""
+
+    permission_classes = [AllowAny]
+
+    async def get(self, request, movie_id, *args, **kwargs):
+        detail = await aget_cached_histogram(movie_id)
+        if detail is None:
+            histogram = await ScoreHistogram.objects.filter(movie_id=movie_id).afirst()
+            if histogram is None:
+                if not await Movie.objects.filter(id=movie_id).aexists():
+                    raise Http404
+                counts = dict.fromkeys(SCORES, 0)
+            else:
+                counts = histogram.counts()
+            detail = {
+                "movie_id": movie_id,
+                "vote_count": sum(counts.values()),
+                "histogram": {str(score): votes for score, votes in counts.items()},
+            }
+            await aset_cached_histogram(movie_id, detail)
+
+        return Response({"success": True, "detail": detail}, status=status.HTTP_200_OK)
+
+
+class CategoryUploadStatus(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request, category_id, *args, **kwargs):
+        category = get_object_or_404(Category, id=category_id)
+        return Response(
+            {
+                "success": True,
+                "detail": {
+                    "upload_status": category.upload_status,
+                    "cover_url": (
+                        str(category.cover_url) if category.cover_url else None
+                    ),
+                },
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
 class RateMovie(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -257,11 +653,20 @@ class RateMovie(APIView):
             )
 
         movie = get_object_or_404(Movie, id=movie_id)
-        rating = Rating.objects.filter(user=request.user, movie=movie).first()
+
+        with transaction.atomic():
+            rating = (
+                Rating.objects.select_for_update()
+                .filter(user=request.user, movie=movie)
+                .first()
+            )
+            if rating:
+                rating.delete()
+                record_rating_change(movie, rating.score, None)
+                remove_user_score(request.user.id, movie.id)
+                transaction.on_commit(lambda: fold_in_user.delay(request.user.id))
 
         if rating:
-            rating.delete()
-            movie.update_ratings()
             return Response(
                 {"success": True, "detail": "Rating removed successfully."},
                 status=status.HTTP_200_OK,